@@ -0,0 +1,248 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+import numpy as np
+from PIL import Image
+
+from input_generator import CHANNELS_OPTIONS
+
+# Every sweep varies one parameter of DEFAULT_CASE at a time
+DEFAULT_CASE = {'size': 1024, 'num_bits': 1, 'channels': 'RGB', 'gap': 0, 'horizontal': 1, 'utilization': 0.5}
+SWEEPS = {
+    'size': [256, 512, 1024, 2048, 4096],
+    'num_bits': list(range(1, 9)),
+    'channels': CHANNELS_OPTIONS,
+    'gap': list(range(0, 6)),
+    'horizontal': [0, 1],
+    'utilization': [0.1, 0.5, 0.9],
+}
+INPUT_GENERATOR_SIZES = [256, 1024, 4096]
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def case_id(case):
+    if case.get('op') == 'input_generator':
+        return f"input_generator size={case['size']}"
+    return (f"codec size={case['size']} bits={case['num_bits']} ch={case['channels']} gap={case['gap']} "
+            f"h={case['horizontal']} util={case['utilization']}")
+
+
+def build_cases(sizes=None, full_grid=False):
+    """Codec cases (one-parameter sweeps, or the full grid) followed by input generator cases"""
+    sweeps = dict(SWEEPS, size=sizes or SWEEPS['size'])
+    if full_grid:
+        keys = list(sweeps)
+        cases = [dict(zip(keys, values)) for values in itertools.product(*sweeps.values())]
+    else:
+        # The other sweeps run at the default size unless it was left out
+        base = dict(DEFAULT_CASE)
+        if base['size'] not in sweeps['size']:
+            base['size'] = sweeps['size'][0]
+        cases = []
+        for key, values in sweeps.items():
+            cases.extend(dict(base, **{key: value}) for value in values)
+
+    unique = {case_id(case): case for case in cases}
+    gen_sizes = [s for s in INPUT_GENERATOR_SIZES if s in sweeps['size']] or sweeps['size'][:1]
+    for size in gen_sizes:
+        case = {'op': 'input_generator', 'size': size}
+        unique[case_id(case)] = case
+    return list(unique.values())
+
+
+def latency_stats(seconds, payload_bytes=None):
+    ms = np.asarray(seconds) * 1000
+    stats = {
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p90_ms': round(float(np.percentile(ms, 90)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+    }
+    if payload_bytes:
+        stats['throughput_mb_s'] = round(payload_bytes / 1e6 / (stats['p50_ms'] / 1000), 3)
+    return stats
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_codec_case(case, repeats):
+    """Time encode_message and decode_message on a random cover filled to case['utilization']"""
+    from encode_decode import decode_message, encode_message, message_capacity
+    from message_generator import generate_message_by_length
+
+    size, channels, num_bits = case['size'], case['channels'], case['num_bits']
+    capacity = message_capacity(size, size, (0, 0), case['gap'], channels, num_bits, '#', '#', case['horizontal'])
+    message = generate_message_by_length(max(1, int(capacity * case['utilization'])))
+    params = dict(start_position=(0, 0), gap=case['gap'], channels=channels, num_bits=num_bits,
+                  delimiter_start='#', delimiter_end='#', horizontal=case['horizontal'])
+
+    rng = np.random.default_rng(0)
+    encode_seconds, decode_seconds = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        cover_path = os.path.join(tmp, 'cover.png')
+        out_path = os.path.join(tmp, 'encoded.png')
+        Image.fromarray(rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)).save(cover_path)
+
+        for _ in range(repeats):
+            start = time.perf_counter()
+            ok = encode_message(cover_path, out_path, message, **params)
+            encode_seconds.append(time.perf_counter() - start)
+            if not ok:
+                return {'error': 'encode_message failed'}
+
+            start = time.perf_counter()
+            decoded = decode_message(out_path, **params)
+            decode_seconds.append(time.perf_counter() - start)
+            if decoded != message:
+                return {'error': 'decoded message does not match'}
+
+    return {
+        'payload_bytes': len(message),
+        'encode': latency_stats(encode_seconds, len(message)),
+        'decode': latency_stats(decode_seconds, len(message)),
+    }
+
+
+def run_input_generator_case(case, repeats):
+    """Time generate_steganography_input for one cover size"""
+    from input_generator import generate_steganography_input
+
+    random.seed(0)
+    generate_steganography_input(case['size'], case['size'])  # loads the message corpus
+    seconds = []
+    for _ in range(repeats * 10):
+        start = time.perf_counter()
+        generate_steganography_input(case['size'], case['size'])
+        seconds.append(time.perf_counter() - start)
+    return {'generate': latency_stats(seconds)}
+
+
+def run_case(case, repeats):
+    runner = run_input_generator_case if case.get('op') == 'input_generator' else run_codec_case
+    result = runner(case, repeats)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def run_benchmarks(cases, repeats=5, isolate=True, verbose=True):
+    """
+    Run every case and return {case id: metrics}. With isolate=True each
+    case runs in a fresh process so peak RSS belongs to that case alone.
+    """
+    results = {}
+    pool = get_context('spawn').Pool(1, maxtasksperchild=1) if isolate else None
+    try:
+        for i, case in enumerate(cases, 1):
+            if pool is not None:
+                result = pool.apply(run_case, (case, repeats))
+            else:
+                result = run_case(case, repeats)
+            results[case_id(case)] = dict(result, case=case)
+            if verbose:
+                print(f"[{i}/{len(cases)}] {format_result(case_id(case), result)}")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return results
+
+
+def format_result(name, result):
+    if 'error' in result:
+        return f"{name}: !!! {result['error']}"
+    timings = ', '.join(f"{op} p50 {result[op]['p50_ms']:.3g} ms"
+                        + (f" ({result[op]['throughput_mb_s']:.2f} MB/s)" if 'throughput_mb_s' in result[op] else '')
+                        for op in ('encode', 'decode', 'generate') if op in result)
+    return f"{name}: {timings}, peak RSS {result['peak_rss_mb']} MB"
+
+
+def save_baseline(results, path, repeats):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    baseline = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'numpy': np.__version__, 'cpu_count': os.cpu_count()},
+        'repeats': repeats,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def find_regressions(results, baseline, threshold=0.2, rss_threshold=0.25):
+    """
+    Cases whose p50 latency grew by more than `threshold` or whose peak RSS
+    grew by more than `rss_threshold` (fractions) against the baseline.
+    Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or 'error' in old:
+            continue
+        if 'error' in result:
+            regressions.append(f"{name}: {result['error']}")
+            continue
+        for op in ('encode', 'decode', 'generate'):
+            if op in result and op in old and result[op]['p50_ms'] > old[op]['p50_ms'] * (1 + threshold):
+                regressions.append(f"{name}: {op} p50 {old[op]['p50_ms']:.1f} -> {result[op]['p50_ms']:.1f} ms")
+        if result['peak_rss_mb'] > old['peak_rss_mb'] * (1 + rss_threshold):
+            regressions.append(f"{name}: peak RSS {old['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encode/decode and input generation across LSB variants")
+    parser.add_argument("--sizes", type=int, nargs='+', default=None, help="Cover edge lengths (default 256..4096)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--full-grid", action='store_true', help="Every parameter combination instead of one-at-a-time sweeps")
+    parser.add_argument("--no-isolate", action='store_true', help="Run cases in this process (peak RSS is then cumulative)")
+    parser.add_argument("--output", default=None, help="Write this run's results as JSON")
+    parser.add_argument("--save-baseline", nargs='?', const=DEFAULT_BASELINE, default=None,
+                        help=f"Store this run as the baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument("--compare", nargs='?', const=DEFAULT_BASELINE, default=None,
+                        help="Fail if this run regresses against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 latency growth (0.2 = 20%%)")
+    parser.add_argument("--rss-threshold", type=float, default=0.25, help="Allowed peak RSS growth")
+    args = parser.parse_args()
+
+    cases = build_cases(args.sizes, args.full_grid)
+    print(f"Running {len(cases)} benchmark cases, {args.repeats} repeats each")
+    results = run_benchmarks(cases, args.repeats, isolate=not args.no_isolate)
+
+    if args.output:
+        save_baseline(results, args.output, args.repeats)
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline, args.repeats)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        regressions = find_regressions(results, load_baseline(args.compare), args.threshold, args.rss_threshold)
+        if regressions:
+            print(f"!!! {len(regressions)} regressions against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
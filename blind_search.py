@@ -0,0 +1,289 @@
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from encode_decode import load_pixels, lsb_planes
+from input_generator import CHANNELS_OPTIONS, DELIMITER_OPTIONS
+
+NUM_BITS_OPTIONS = list(range(1, 9))
+GAP_OPTIONS = list(range(0, 6))
+
+# Workers are capped so their combined peak stays within this budget
+SEARCH_MEMORY_BYTES = 2 * 1024 * 1024 * 1024
+
+# Log-likelihood weights of a character under "printable text" vs "random LSB noise"
+PRINTABLE_WEIGHT = math.log(256 / 95)
+NON_PRINTABLE_WEIGHT = math.log(256 * 1e-4)
+
+_worker_image = None
+_worker_memory = None
+
+
+def _init_worker(memory_name, shape, dtype):
+    # Every worker maps the parent's copy of the image instead of receiving its own
+    global _worker_image, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_image = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+
+
+def worker_peak_bytes(shape, channels_options=CHANNELS_OPTIONS, num_bits_options=NUM_BITS_OPTIONS):
+    """
+    Rough peak memory of one search_channel_config call on an image of this
+    shape, for the widest configuration: the bit plane, its transposed copy,
+    one stream, its per-offset bytes and the printable prefix sums come to
+    about 16 bytes per plane bit, plus a fixed per-pixel part.
+    """
+    pixels = int(shape[0]) * int(shape[1])
+    widest = max(len(channels) for channels in channels_options) * max(num_bits_options)
+    return pixels * (16 * widest + 64)
+
+
+def _bytes_at_every_offset(bits):
+    """byte_at[p] is the byte formed by bits[p:p + 8], for every bit offset p (zero padded past the end)"""
+    byte_at = np.zeros(len(bits), dtype=np.uint8)
+    for shift in range(8):
+        packed = np.packbits(bits[shift:])
+        byte_at[shift::8] = packed
+    return byte_at
+
+
+def _pattern_matches(byte_at, pattern):
+    """Boolean array, True at every bit offset where the byte-aligned pattern starts"""
+    codes = pattern.encode('latin-1')
+    span = 8 * len(codes)
+    count = len(byte_at) - span + 1
+    if count <= 0:
+        return np.zeros(0, dtype=bool)
+
+    matches = np.ones(count, dtype=bool)
+    for j, code in enumerate(codes):
+        matches &= byte_at[8 * j: 8 * j + count] == code
+    return matches
+
+
+def _pattern_matches_at(byte_at, offsets, pattern):
+    """Boolean array, True where the pattern starts at the given bit offsets"""
+    codes = pattern.encode('latin-1')
+    matches = offsets + 8 * len(codes) <= len(byte_at)
+    for j, code in enumerate(codes):
+        matches[matches] = byte_at[offsets[matches] + 8 * j] == code
+    return matches
+
+
+def _search_stream(bits, bits_per_pixel, pixel_positions, delimiter_pairs, min_length, max_length, top_k):
+    """
+    Find every delimiter-framed message in one traversal stream.
+
+    pixel_positions[k] is the traversal position of pixel k of the stream, or
+    -1 when that pixel is not an allowed start. Returns the per-offset byte
+    view of the stream and tuples of (score, start_pixel, pair_index,
+    message_bit_offset, end_bit_offset), at most top_k per delimiter pair.
+    """
+    byte_at = _bytes_at_every_offset(bits)
+    printable_prefix = None
+
+    starts = np.flatnonzero(pixel_positions >= 0)
+    start_bits = starts * bits_per_pixel
+    end_positions = {}
+    found = []
+
+    for pair_index, (delimiter_start, delimiter_end) in enumerate(delimiter_pairs):
+        hit = _pattern_matches_at(byte_at, start_bits, delimiter_start)
+        if not hit.any():
+            continue
+
+        if delimiter_end not in end_positions:
+            end_positions[delimiter_end] = np.flatnonzero(_pattern_matches(byte_at, delimiter_end))
+        ends = end_positions[delimiter_end]
+        if len(ends) == 0:
+            continue
+
+        message_bits = start_bits[hit] + 8 * len(delimiter_start)
+        pixels = starts[hit]
+
+        # First end delimiter on the same byte grid as the message
+        end_bits = np.full(len(message_bits), -1, dtype=np.int64)
+        for shift in range(8):
+            on_grid = message_bits % 8 == shift
+            grid_ends = ends[ends % 8 == shift]
+            if not on_grid.any() or len(grid_ends) == 0:
+                continue
+            idx = np.searchsorted(grid_ends, message_bits[on_grid])
+            valid = idx < len(grid_ends)
+            grid_result = np.full(len(idx), -1, dtype=np.int64)
+            grid_result[valid] = grid_ends[idx[valid]]
+            end_bits[on_grid] = grid_result
+
+        lengths = np.where(end_bits >= 0, (end_bits - message_bits) // 8, -1)
+        keep = lengths >= min_length
+        if max_length is not None:
+            keep &= lengths <= max_length
+        if not keep.any():
+            continue
+
+        message_bits, end_bits, lengths, pixels = message_bits[keep], end_bits[keep], lengths[keep], pixels[keep]
+        if printable_prefix is None:
+            # Printable counts along each of the 8 byte grids, so any message span is scored in O(1)
+            printable = (byte_at >= 32) & (byte_at < 127)
+            printable_prefix = [np.concatenate([[0], np.cumsum(printable[shift::8], dtype=np.int64)])
+                                for shift in range(8)]
+        shifts = message_bits % 8
+        n_printable = np.zeros(len(message_bits), dtype=np.int64)
+        for shift in range(8):
+            on_grid = shifts == shift
+            if on_grid.any():
+                prefix = printable_prefix[shift]
+                n_printable[on_grid] = (prefix[(end_bits[on_grid] - shift) // 8] -
+                                        prefix[(message_bits[on_grid] - shift) // 8])
+
+        scores = n_printable * PRINTABLE_WEIGHT + (lengths - n_printable) * NON_PRINTABLE_WEIGHT
+        if len(scores) > top_k:
+            top = np.argpartition(scores, -top_k)[-top_k:]
+            scores, pixels, message_bits, end_bits = scores[top], pixels[top], message_bits[top], end_bits[top]
+        for score, pixel, msg_bit, end_bit in zip(scores, pixels, message_bits, end_bits):
+            found.append((float(score), int(pixel), pair_index, int(msg_bit), int(end_bit)))
+
+    return byte_at, found
+
+
+def search_channel_config(img, channels, num_bits, gaps=GAP_OPTIONS, directions=(1, 0),
+                          delimiter_pairs=DELIMITER_OPTIONS, max_start=None,
+                          min_length=1, max_length=None, top_k=20):
+    """
+    Try every start position, gap, direction and delimiter pair for one (channels, num_bits).
+
+    The LSB plane is extracted once and reused for every traversal: a
+    traversal with step gap + 1 is a suffix of one of gap + 1 interleaved
+    streams, so each stream is scanned once for all start positions.
+    Returns the top_k candidates sorted by score (best first).
+    """
+    img = load_pixels(img)
+    rows, cols = img.shape[:2]
+    plane = lsb_planes(img, channels, num_bits)
+    bits_per_pixel = plane.shape[1]
+    max_row, max_col = max_start if max_start is not None else (rows - 1, cols - 1)
+
+    best = []
+    for horizontal in directions:
+        if horizontal:
+            sequence = plane
+        else:
+            sequence = plane.reshape(rows, cols, bits_per_pixel).transpose(1, 0, 2).reshape(-1, bits_per_pixel)
+
+        for gap in gaps:
+            step = gap + 1
+            for residue in range(min(step, len(sequence))):
+                positions = np.arange(residue, len(sequence), step, dtype=np.int64)
+                if horizontal:
+                    start_rows, start_cols = positions // cols, positions % cols
+                else:
+                    start_cols, start_rows = positions // rows, positions % rows
+                allowed = np.where((start_rows <= max_row) & (start_cols <= max_col), positions, -1)
+                if not (allowed >= 0).any():
+                    continue
+
+                bits = sequence[residue::step].ravel()
+                byte_at, found = _search_stream(bits, bits_per_pixel, allowed, delimiter_pairs,
+                                                min_length, max_length, top_k)
+                for score, pixel, pair_index, msg_bit, end_bit in found:
+                    position = int(positions[pixel])
+                    if horizontal:
+                        start_position = (position // cols, position % cols)
+                    else:
+                        start_position = (position % rows, position // rows)
+                    entry = (score, -msg_bit, (start_position, gap, horizontal, pair_index),
+                             byte_at[msg_bit:end_bit:8].tobytes())
+                    if len(best) < top_k:
+                        heapq.heappush(best, entry)
+                    elif entry[:2] > best[0][:2]:
+                        heapq.heapreplace(best, entry)
+
+    results = []
+    for score, _, (start_position, gap, horizontal, pair_index), payload in sorted(best, key=lambda e: e[:2], reverse=True):
+        delimiter_start, delimiter_end = delimiter_pairs[pair_index]
+        results.append({
+            'score': round(score, 3),
+            'message': payload.decode('latin-1'),
+            'start_position': start_position,
+            'gap': gap,
+            'channels': channels,
+            'num_bits': num_bits,
+            'horizontal': horizontal,
+            'delimiter_start': delimiter_start,
+            'delimiter_end': delimiter_end
+        })
+    return results
+
+
+def _search_worker(channels, num_bits, options):
+    return search_channel_config(_worker_image, channels, num_bits, **options)
+
+
+def iter_blind_search(image, channels_options=CHANNELS_OPTIONS, num_bits_options=NUM_BITS_OPTIONS,
+                      workers=None, max_memory_bytes=SEARCH_MEMORY_BYTES, **options):
+    """
+    Search the parameter space of an image with a process pool and yield candidates as they come in.
+
+    Each (channels, num_bits) configuration is one task. Its candidates are
+    yielded best first when the task finishes, so the stream is in task
+    completion order and is not a global ranking; use blind_search for the
+    overall best candidates. Workers share one copy of the image and their
+    number is capped so that worker_peak_bytes of each fits in
+    max_memory_bytes together. Extra keyword arguments are passed to
+    search_channel_config.
+    """
+    img = load_pixels(image)
+    configs = [(channels, num_bits) for channels in channels_options for num_bits in num_bits_options]
+    workers = os.cpu_count() if workers is None else workers
+    if max_memory_bytes is not None:
+        per_worker = worker_peak_bytes(img.shape, channels_options, num_bits_options)
+        workers = min(workers, max(1, max_memory_bytes // per_worker))
+
+    if workers <= 1:
+        for channels, num_bits in configs:
+            yield from search_channel_config(img, channels, num_bits, **options)
+        return
+
+    memory = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+    try:
+        np.ndarray(img.shape, dtype=img.dtype, buffer=memory.buf)[...] = img
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(memory.name, img.shape, img.dtype.str)) as pool:
+            futures = [pool.submit(_search_worker, channels, num_bits, options) for channels, num_bits in configs]
+            for future in as_completed(futures):
+                yield from future.result()
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def blind_search(image, top_k=10, **options):
+    """Run the full blind search and return the top_k candidates over all configurations, best first"""
+    best = heapq.nlargest(top_k, iter_blind_search(image, top_k=top_k, **options), key=lambda c: c['score'])
+    return best
+
+
+if __name__ == "__main__":
+    import time
+    from encode_decode import encode_array
+    from input_generator import generate_steganography_input
+
+    rng = np.random.default_rng(0)
+    cover = rng.integers(0, 256, size=(256, 256, 3), dtype=np.uint8)
+    params = generate_steganography_input(256, 256)
+    stego = encode_array(cover, params['message'], params['start_position'], params['gap'],
+                         params['channels'], params['num_bits'], params['delimiter_start'],
+                         params['delimiter_end'], params['horizontal'])
+
+    start = time.perf_counter()
+    candidates = blind_search(stego, top_k=3)
+    elapsed = time.perf_counter() - start
+
+    print(f"Searched in {elapsed:.2f}s")
+    print("Expected:", {k: params[k] for k in ('start_position', 'gap', 'channels', 'num_bits', 'horizontal')})
+    for candidate in candidates:
+        print(candidate['score'], {k: candidate[k] for k in ('start_position', 'gap', 'channels', 'num_bits', 'horizontal')})
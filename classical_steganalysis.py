@@ -0,0 +1,271 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+from scipy.special import gammaincc
+
+CHANNEL_INDEX = {'R': 0, 'G': 1, 'B': 2}
+
+# Number of row-major / column-major segments the chi-square attack is run on,
+# and the fewest pixels a segment may have before fewer segments are used
+CHI_SEGMENTS = 16
+CHI_MIN_SEGMENT_PIXELS = 4096
+
+# RS/SPA estimate every channel must reach for a 'stego' verdict. Clean crops of
+# natural JPEG photos measured up to about 0.39, so lower values go on to the CNN.
+STEGO_RATE = 0.45
+
+
+def _channel_planes(img, channels='RGB'):
+    img = np.asarray(img)
+    if img.ndim == 2:
+        return {'R': img}
+    return {c: img[:, :, CHANNEL_INDEX[c]] for c in channels.upper()}
+
+
+def chi_square_probability(histograms):
+    """
+    Westfeld-Pfitzmann chi-square attack on one or more 256-bin histograms
+    (shape (..., 256)). Returns the probability that the values' LSBs were
+    replaced by random message bits, 1.0 meaning the pairs of values
+    (2k, 2k+1) are as equalized as LSB embedding leaves them.
+    """
+    pairs = histograms.reshape(*histograms.shape[:-1], 128, 2).astype(np.float64)
+    expected = pairs.sum(axis=-1) / 2
+    used = expected > 4  # the chi-square approximation needs enough samples per pair
+    chi2 = np.where(used, (pairs[..., 0] - expected) ** 2 / np.where(used, expected, 1), 0).sum(axis=-1)
+    dof = used.sum(axis=-1) - 1
+    return np.where(dof > 0, gammaincc(np.maximum(dof, 1) / 2, chi2 / 2), 0.0)
+
+
+def chi_square_attack(plane, segments=CHI_SEGMENTS):
+    """
+    Chi-square attack on one channel. Besides the whole plane, the attack
+    runs on up to `segments` consecutive slices in row-major and in
+    column-major order, since messages fill a contiguous run of the
+    traversal. Returns the highest probability found.
+    """
+    segments = max(1, min(segments, plane.size // CHI_MIN_SEGMENT_PIXELS))
+    histograms = [np.bincount(part, minlength=256)
+                  for flat in (plane.ravel(), plane.T.ravel())
+                  for part in np.array_split(flat, segments)]
+    histograms = np.vstack(histograms + [np.sum(histograms[:segments], axis=0)])
+    return float(chi_square_probability(histograms).max())
+
+
+_VALUES = np.arange(256, dtype=np.int16)
+
+# Flipping functions as lookup tables: F1 swaps 2k <-> 2k+1, F-1 swaps 2k-1 <-> 2k, F0 is the identity
+_FLIPS = {0: _VALUES, 1: _VALUES ^ 1, -1: ((_VALUES + 1) ^ 1) - 1}
+
+
+def _regular_singular(columns, mask, base=_VALUES):
+    """
+    Fractions of regular and singular groups for one flipping mask.
+    columns holds the uint8 pixels of each group position; base is applied
+    to every pixel first (the LSB-flipped image uses F1).
+    """
+    def smoothness(values):
+        return sum(np.abs(b - a) for a, b in zip(values, values[1:]))
+
+    before = smoothness([base[c] for c in columns])
+    after = smoothness([_FLIPS[m][base][c] for m, c in zip(mask, columns)])
+    return np.mean(after > before), np.mean(after < before)
+
+
+def rs_analysis(plane, mask=(0, 1, 1, 0)):
+    """
+    Fridrich's RS analysis on one channel: estimated fraction of pixels
+    whose LSB carries message bits (0 for a clean image, about 1 for full
+    capacity LSB replacement).
+    """
+    n = len(mask)
+    rows, cols = plane.shape
+    groups = plane[:, :cols - cols % n].reshape(-1, n)
+    if len(groups) == 0:
+        return 0.0
+    columns = [np.ascontiguousarray(groups[:, i]) for i in range(n)]
+    negative = tuple(-m for m in mask)
+
+    r_m, s_m = _regular_singular(columns, mask)
+    r_n, s_n = _regular_singular(columns, negative)
+    r_m1, s_m1 = _regular_singular(columns, mask, _FLIPS[1])
+    r_n1, s_n1 = _regular_singular(columns, negative, _FLIPS[1])
+
+    d0, d1 = r_m - s_m, r_m1 - s_m1
+    n0, n1 = r_n - s_n, r_n1 - s_n1
+    a = 2 * (d1 + d0)
+    b = n0 - n1 - d1 - 3 * d0
+    c = d0 - n0
+    if abs(a) < 1e-12:
+        x = -c / b if abs(b) > 1e-12 else 0.0
+    else:
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return 0.0
+        roots = ((-b + np.sqrt(disc)) / (2 * a), (-b - np.sqrt(disc)) / (2 * a))
+        x = min(roots, key=abs)
+    if abs(x - 0.5) < 1e-12:
+        return 1.0
+    return float(np.clip(x / (x - 0.5), 0.0, 1.0))
+
+
+def sample_pair_analysis(plane):
+    """
+    Sample pair analysis (Dumitrescu, Wu, Wang) on horizontally adjacent
+    pixels of one channel: estimated fraction of LSBs carrying message bits.
+    """
+    u = plane[:, :-1].astype(np.int16).ravel()
+    v = plane[:, 1:].astype(np.int16).ravel()
+    if u.size == 0:
+        return 0.0
+    even = v % 2 == 0
+    x = np.count_nonzero((even & (u < v)) | (~even & (u > v)))
+    y = np.count_nonzero((even & (u > v)) | (~even & (u < v)))
+    k = np.count_nonzero(u // 2 == v // 2)
+    if k == 0:
+        return 0.0
+
+    a, b, c = 2 * k, 2 * (2 * x - u.size), y - x
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return 0.0
+    beta = min((-b + np.sqrt(disc)) / (2 * a), (-b - np.sqrt(disc)) / (2 * a))
+    return float(np.clip(2 * beta, 0.0, 1.0))
+
+
+def classical_scores(img, channels='RGB'):
+    """All three detectors on every requested channel of an RGB array"""
+    scores = {}
+    for channel, plane in _channel_planes(img, channels).items():
+        scores[channel] = {
+            'chi_square': chi_square_attack(plane),
+            'rs': rs_analysis(plane),
+            'spa': sample_pair_analysis(plane),
+        }
+    return scores
+
+
+def classical_verdict(scores, clean_rate=0.02, stego_rate=STEGO_RATE, chi_threshold=0.99):
+    """
+    'stego' or 'clean' when the classical detectors agree confidently,
+    None when the image should go on to the CNN.
+
+    An image is stego only when all three detectors agree on every channel:
+    chi-square probability at least chi_threshold and RS and SPA both
+    estimating at least stego_rate. Chi-square alone is not enough, the
+    smooth histograms of clean photos often score close to 1. It is clean
+    only when every channel's RS and SPA estimates stay below clean_rate
+    and no chi-square probability exceeds 1 - chi_threshold.
+    """
+    rates = [(s['rs'], s['spa']) for s in scores.values()]
+    chi = [s['chi_square'] for s in scores.values()]
+    if min(chi) >= chi_threshold and all(min(r) >= stego_rate for r in rates):
+        return 'stego'
+    if max(chi) <= 1 - chi_threshold and all(max(r) < clean_rate for r in rates):
+        return 'clean'
+    return None
+
+
+class TierStats:
+    """Images received, decided and forwarded by one detector tier, with its latency"""
+
+    def __init__(self, name):
+        self.name = name
+        self.received = 0
+        self.decided = 0
+        self.forwarded = 0
+        self.seconds = 0.0
+
+    def record(self, seconds, decided):
+        self.received += 1
+        self.seconds += seconds
+        if decided:
+            self.decided += 1
+        else:
+            self.forwarded += 1
+
+    def summary(self):
+        return {
+            'tier': self.name,
+            'received': self.received,
+            'decided': self.decided,
+            'forwarded': self.forwarded,
+            'total_seconds': round(self.seconds, 3),
+            'ms_per_image': round(1000 * self.seconds / self.received, 2) if self.received else 0.0,
+        }
+
+
+def tiered_detect(paths, model=None, channels='RGB', clean_rate=0.02, stego_rate=STEGO_RATE,
+                  chi_threshold=0.99, threshold=0.5, stats=None):
+    """
+    Run the classical tier on every image and the CNN (tiled, as in
+    stego_scanner) only on the images it leaves undecided. Without a model
+    the undecided images are reported as 'uncertain'.
+
+    Yields one result dict per image, with the tier that decided it. Pass
+    stats=(TierStats('classical'), TierStats('cnn')) to collect per-tier
+    latency and forwarded counts.
+    """
+    from stego_scanner import load_rgb, score_image
+
+    classical, cnn = stats if stats is not None else (TierStats('classical'), TierStats('cnn'))
+
+    for path in paths:
+        try:
+            pixels = load_rgb(path)
+        except Exception as e:
+            yield {'path': path, 'verdict': 'error', 'tier': '', 'error': str(e)}
+            continue
+
+        start = time.perf_counter()
+        scores = classical_scores(pixels, channels)
+        verdict = classical_verdict(scores, clean_rate, stego_rate, chi_threshold)
+        classical.record(time.perf_counter() - start, verdict is not None)
+
+        result = {'path': path, 'verdict': verdict, 'tier': 'classical', 'error': ''}
+        for channel, channel_scores in scores.items():
+            for detector, value in channel_scores.items():
+                result[f'{detector}_{channel}'] = round(value, 4)
+
+        if verdict is None:
+            if model is None:
+                result['verdict'] = 'uncertain'
+            else:
+                start = time.perf_counter()
+                cnn_score, _ = score_image(model, pixels)
+                cnn.record(time.perf_counter() - start, True)
+                result.update(verdict='stego' if cnn_score >= threshold else 'clean', tier='cnn',
+                              cnn_score=round(cnn_score, 6))
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classical LSB steganalysis pre-filter in front of the CNN")
+    parser.add_argument("root", help="Image file or directory to check")
+    parser.add_argument("--model", default=None, help="Keras model for undecided images (omit for classical only)")
+    parser.add_argument("--channels", default='RGB', help="Channels to analyse")
+    parser.add_argument("--clean-rate", type=float, default=0.02, help="RS/SPA estimate below which a channel is clean")
+    parser.add_argument("--stego-rate", type=float, default=STEGO_RATE,
+                        help="RS/SPA estimate every channel must reach, with chi-square, for a stego verdict")
+    parser.add_argument("--chi-threshold", type=float, default=0.99,
+                        help="Chi-square probability every channel must reach for a stego verdict")
+    args = parser.parse_args()
+
+    from stego_scanner import iter_image_files, load_model
+    model = load_model(args.model) if args.model else None
+
+    stats = (TierStats('classical'), TierStats('cnn'))
+    for result in tiered_detect(iter_image_files(args.root), model, args.channels, args.clean_rate,
+                                args.stego_rate, args.chi_threshold, stats=stats):
+        print(f"{result['verdict']:>9}  [{result['tier'] or '-':>9}]  {result['path']}")
+
+    for tier in stats:
+        s = tier.summary()
+        print(f"{s['tier']}: {s['received']} images, {s['decided']} decided, "
+              f"{s['forwarded']} forwarded, {s['ms_per_image']} ms/image", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
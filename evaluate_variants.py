@@ -0,0 +1,374 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from image_io import read_rgb
+from stego_scanner import IMAGE_EXTENSIONS, MODEL_PATH, iter_image_files, load_model
+from verify_dataset import default_images_dir, iter_manifest_chunks
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prediction_cache.db')
+IMAGE_SIZE = (256, 256)
+
+# Manifest columns the report is sliced by, plus the derived utilization bucket
+GROUP_FIELDS = ['num_bits', 'channels', 'gap', 'horizontal', 'utilization_bucket']
+UTILIZATION_BUCKETS = (1, 5, 10, 25, 50, 100)
+SPLITS = ('test', 'val', 'train', 'all')
+PREDICTION_FIELDS = ['encoded_image', 'image_hash', 'score', 'detected', 'num_bits', 'channels', 'gap',
+                     'horizontal', 'utilization_percent', 'utilization_bucket', 'error']
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_hash(model_path):
+    """Content hash of a saved model file (or of every file under a SavedModel directory)"""
+    if os.path.isfile(model_path):
+        return file_sha256(model_path)
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(model_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            digest.update(os.path.relpath(path, model_path).encode('utf-8'))
+            digest.update(file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def utilization_bucket(percent, buckets=UTILIZATION_BUCKETS):
+    """Label such as '5-10%' for a utilization_percent value"""
+    if percent in (None, ''):
+        return 'unknown'
+    percent = float(percent)
+    lower = 0
+    for upper in buckets:
+        if percent <= upper:
+            return f"{lower}-{upper}%"
+        lower = upper
+    return f">{buckets[-1]}%"
+
+
+class PredictionCache:
+    """
+    Detector scores keyed by (model hash, image hash) in SQLite, so
+    re-running an evaluation, or slicing it differently, only runs
+    inference on images or models it has not seen.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS predictions (model_hash TEXT NOT NULL, "
+                           "image_hash TEXT NOT NULL, score REAL NOT NULL, PRIMARY KEY (model_hash, image_hash))")
+        self._conn.commit()
+
+    def scores(self, model_digest):
+        """Every cached score of one model, as {image hash: score}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT image_hash, score FROM predictions WHERE model_hash = ?",
+                                           (model_digest,)))
+
+    def put_many(self, model_digest, scores):
+        """Store (image hash, score) pairs"""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                                   [(model_digest, image_hash, float(score)) for image_hash, score in scores])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _normalized(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def split_paths(split, clean_dir=None, encoded_dir=None):
+    """
+    Normalized paths of one split of training_data.prepare_dataset, rebuilt
+    with the training seed and fractions, or None for split='all'. The
+    clean directory defaults to the one training uses.
+    """
+    if split == 'all':
+        return None
+    from training_data import CLEAN_IMAGES_DIR, ENCODED_IMAGES_DIR, prepare_dataset
+    X_train, X_val, X_test = prepare_dataset(clean_dir or CLEAN_IMAGES_DIR, encoded_dir or ENCODED_IMAGES_DIR)[:3]
+    return {_normalized(p) for p in {'train': X_train, 'val': X_val, 'test': X_test}[split]}
+
+
+def read_held_out(path):
+    """Normalized paths listed one per line in a held-out list file"""
+    with open(path, encoding='utf-8') as f:
+        return {_normalized(line.strip()) for line in f if line.strip()}
+
+
+def load_for_inference(path, known_hashes, image_size=IMAGE_SIZE):
+    """
+    (image hash, RGB uint8 array at image_size) for one file. The pixels are
+    None when the hash already has a cached score, so cached images are
+    never decoded. Resizing follows training_data.decode_and_resize.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    image_hash = hashlib.sha256(data).hexdigest()
+    if image_hash in known_hashes:
+        return image_hash, None
+    return image_hash, read_rgb(data, image_size)
+
+
+def predict_images(model, items, cache, model_digest, batch_size=32, threads=8, max_pending=None,
+                   image_size=IMAGE_SIZE):
+    """
+    Yield (payload, image hash, score, error) for every (path, payload) item,
+    in input order.
+
+    Files are read, hashed and decoded in a thread pool, at most max_pending
+    ahead of the model. Images whose hash has a cached score for this model
+    skip decoding and inference; the rest are predicted batch_size at a time
+    and their scores written back to the cache per batch.
+    """
+    max_pending = max_pending or 4 * batch_size
+    known = cache.scores(model_digest)
+    items = iter(items)
+    ready = deque()   # (payload, hash, score, error) in input order, score None until predicted
+    batch = []        # (entry, pixels) awaiting inference
+
+    def run_batch():
+        scores = model.predict_on_batch(np.stack([pixels for _, pixels in batch]).astype(np.float32) / 255.0)
+        scores = np.asarray(scores).reshape(-1)
+        for (entry, _), score in zip(batch, scores):
+            entry[2] = round(float(score), 6)
+            known[entry[1]] = entry[2]
+        cache.put_many(model_digest, [(entry[1], entry[2]) for entry, _ in batch])
+        batch.clear()
+
+    def drain():
+        # Emit finished entries from the front so the output keeps input order
+        while ready and (ready[0][2] is not None or ready[0][3]):
+            yield tuple(ready.popleft())
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for path, payload in items:
+            pending.append((payload, pool.submit(load_for_inference, path, known, image_size)))
+            if len(pending) >= max_pending:
+                break
+
+        while pending:
+            payload, future = pending.popleft()
+            next_item = next(items, None)
+            if next_item is not None:
+                pending.append((next_item[1], pool.submit(load_for_inference, next_item[0], known, image_size)))
+
+            try:
+                image_hash, pixels = future.result()
+            except Exception as e:
+                ready.append([payload, '', None, str(e)])
+                yield from drain()
+                continue
+
+            entry = [payload, image_hash, known.get(image_hash), '']
+            ready.append(entry)
+            if entry[2] is None:
+                batch.append((entry, pixels))
+                if len(batch) >= batch_size:
+                    run_batch()
+            yield from drain()
+
+    if batch:
+        run_batch()
+    yield from drain()
+
+
+class VariantStats:
+    """Running detection counts per value of every GROUP_FIELDS column"""
+
+    def __init__(self, threshold=0.5, group_fields=GROUP_FIELDS):
+        self.threshold = threshold
+        self.group_fields = group_fields
+        self.groups = {field: defaultdict(lambda: [0, 0, 0.0]) for field in group_fields}
+        self.overall = [0, 0, 0.0]
+        self.errors = 0
+
+    def add(self, row, score):
+        detected = score >= self.threshold
+        for counts in [self.overall] + [self.groups[field][str(row.get(field, ''))] for field in self.group_fields]:
+            counts[0] += 1
+            counts[1] += detected
+            counts[2] += score
+
+    @staticmethod
+    def _entry(counts):
+        images, detected, score_sum = counts
+        return {'images': images, 'detected': detected,
+                'detection_rate': round(detected / images, 4) if images else 0.0,
+                'mean_score': round(score_sum / images, 4) if images else 0.0}
+
+    @staticmethod
+    def _sort_key(value):
+        try:
+            return (0, float(value.split('-')[0].lstrip('>').rstrip('%')), value)
+        except ValueError:
+            return (1, 0.0, value)
+
+    def summary(self):
+        return {
+            'threshold': self.threshold,
+            'overall': self._entry(self.overall),
+            'errors': self.errors,
+            'by': {field: {value: self._entry(counts)
+                           for value, counts in sorted(values.items(), key=lambda kv: self._sort_key(kv[0]))}
+                   for field, values in self.groups.items()},
+        }
+
+
+def format_report(summary):
+    overall = summary['overall']
+    lines = [f"Split: {summary.get('split', 'all')}",
+             f"Overall: {overall['detected']}/{overall['images']} detected "
+             f"({overall['detection_rate']:.1%}, mean score {overall['mean_score']:.3f}, "
+             f"threshold {summary['threshold']})"]
+    if 'false_positive_rate' in summary:
+        lines.append(f"Clean images: {summary['clean_images']}, false positive rate "
+                     f"{summary['false_positive_rate']:.1%}"
+                     + (f", AUC {summary['auc']:.4f}" if summary.get('auc') is not None else ""))
+    for field, values in summary['by'].items():
+        lines.append(f"\nBy {field}:")
+        lines.append(f"  {'value':<14}{'images':>8}{'detected':>10}{'rate':>9}{'mean':>8}")
+        for value, entry in values.items():
+            lines.append(f"  {value:<14}{entry['images']:>8}{entry['detected']:>10}"
+                         f"{entry['detection_rate']:>9.1%}{entry['mean_score']:>8.3f}")
+    if summary['errors']:
+        lines.append(f"\n!!! {summary['errors']} images could not be scored")
+    return "\n".join(lines)
+
+
+def evaluate_variants(csv_path, model_path=MODEL_PATH, images_dir=None, clean_dir=None, threshold=0.5,
+                      batch_size=32, threads=8, cache_path=DEFAULT_CACHE_PATH, predictions_path=None, model=None,
+                      split='test', held_out=None):
+    """
+    Score the encoded images of a manifest with the detector and report
+    the detection rate per num_bits, channels, gap, horizontal and
+    utilization bucket. With clean_dir the clean images are scored too,
+    adding the false positive rate and AUC. Scores are cached by model and
+    image hash, so a second run only reads and hashes the files. Returns
+    the summary dict.
+
+    Only images of one split are scored: by default the test split that
+    training_data.prepare_dataset holds out, so images the model was
+    trained on do not inflate the rates. held_out (a file listing one
+    image path per line) replaces the split; split='all' scores everything.
+    """
+    images_dir = images_dir or default_images_dir(csv_path)
+    if held_out:
+        selected, split = read_held_out(held_out), f"held out ({held_out})"
+    elif split in SPLITS:
+        selected = split_paths(split, clean_dir, images_dir)
+    else:
+        raise ValueError(f"Unknown split {split!r}, use one of {list(SPLITS)}")
+    print(f"Evaluating {'every manifest image' if selected is None else f'the {split} split'}")
+    digest = model_hash(model_path)
+    model = model if model is not None else load_model(model_path)
+    cache = PredictionCache(cache_path)
+    stats = VariantStats(threshold)
+    stego_scores = []
+
+    def manifest_items():
+        for chunk in iter_manifest_chunks(csv_path):
+            for row in chunk:
+                path = os.path.join(images_dir, row['encoded_image'])
+                if selected is not None and _normalized(path) not in selected:
+                    continue
+                row['utilization_bucket'] = utilization_bucket(row.get('utilization_percent'))
+                yield path, row
+
+    predictions_file = open(predictions_path, 'w', newline='', encoding='utf-8') if predictions_path else None
+    writer = csv.DictWriter(predictions_file, fieldnames=PREDICTION_FIELDS, extrasaction='ignore') \
+        if predictions_file else None
+    if writer:
+        writer.writeheader()
+
+    start = time.perf_counter()
+    try:
+        for row, image_hash, score, error in predict_images(model, manifest_items(), cache, digest,
+                                                            batch_size, threads):
+            if error:
+                stats.errors += 1
+            else:
+                stats.add(row, score)
+                stego_scores.append(score)
+            if writer:
+                writer.writerow({**row, 'image_hash': image_hash, 'score': '' if error else score,
+                                 'detected': '' if error else int(score >= threshold), 'error': error})
+
+        summary = stats.summary()
+        summary['split'] = split
+        if clean_dir:
+            clean_paths = ((path, path) for path in iter_image_files(clean_dir, IMAGE_EXTENSIONS)
+                           if selected is None or _normalized(path) in selected)
+            clean_scores = [score for _, _, score, error in predict_images(model, clean_paths, cache, digest,
+                                                                           batch_size, threads) if not error]
+            summary['clean_images'] = len(clean_scores)
+            summary['false_positive_rate'] = round(float(np.mean(np.asarray(clean_scores) >= threshold)), 4) \
+                if clean_scores else 0.0
+            summary['auc'] = None
+            if clean_scores and stego_scores:
+                from sklearn.metrics import roc_auc_score
+                summary['auc'] = round(float(roc_auc_score([0] * len(clean_scores) + [1] * len(stego_scores),
+                                                           clean_scores + stego_scores)), 4)
+    finally:
+        cache.close()
+        if predictions_file:
+            predictions_file.close()
+
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    summary['model_hash'] = digest
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection rate of the CNN detector per LSB variant")
+    parser.add_argument("manifest", help="encoding_params_{N}x.csv")
+    parser.add_argument("--model", default=MODEL_PATH, help="Trained Keras model")
+    parser.add_argument("--images-dir", default=None, help="Encoded images (default: encoded_{N}x next to the manifest)")
+    parser.add_argument("--clean-dir", default=None, help="Clean images, adds false positive rate and AUC")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Score at or above which an image is stego")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per predict call")
+    parser.add_argument("--threads", type=int, default=8, help="Image loading threads")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Prediction cache database")
+    parser.add_argument("--predictions", default=None, help="Write per-image scores joined with the manifest (CSV)")
+    parser.add_argument("--json", default=None, help="Write the summary as JSON")
+    parser.add_argument("--split", choices=SPLITS, default='test',
+                        help="Split of the training data to score, rebuilt like training_data.prepare_dataset")
+    parser.add_argument("--held-out", default=None, help="File listing the image paths to score, replaces --split")
+    args = parser.parse_args()
+
+    summary = evaluate_variants(args.manifest, args.model, args.images_dir, args.clean_dir, args.threshold,
+                                args.batch_size, args.threads, args.cache, args.predictions,
+                                split=args.split, held_out=args.held_out)
+    print(format_report(summary))
+    print(f"\nDone in {summary['seconds']}s")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
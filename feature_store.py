@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from image_io import read_rgb
+
+MANIFEST_NAME = 'manifest.json'
+IMAGE_SIZE = (256, 256)
+FEATURES = ('rgb', 'lsb', 'residual')
+TARGET_SHARD_IMAGES = 256
+
+# Same class folders and label convention as training_data.collect_image_paths
+DEFAULT_SOURCES = (('data/linnaeus5', 0), ('data/encoded_1x', 1))
+SOURCE_EXTENSIONS = ('.png', '.jpg')
+
+# 3x3 second-order high-pass (KB) kernel; integer weights keep uint8 residuals exact in int16
+RESIDUAL_KERNEL = np.array([[-1, 2, -1], [2, -4, 2], [-1, 2, -1]], dtype=np.int16)
+
+# Bump when a feature's computation changes so its old shards are rebuilt
+FEATURE_VERSION = 1
+
+
+def lsb_features(pixels, lsb_bits=1):
+    """0/1 planes of the lsb_bits lowest bits, (rows, cols, 3 * lsb_bits) uint8, bit 0 first"""
+    return np.concatenate([(pixels >> bit) & 1 for bit in range(lsb_bits)], axis=-1)
+
+
+def high_pass_residual(pixels, kernel=RESIDUAL_KERNEL):
+    """Per-channel convolution with a high-pass kernel (edges replicated), int16"""
+    radius = kernel.shape[0] // 2
+    padded = np.pad(pixels.astype(np.int16), ((radius, radius), (radius, radius), (0, 0)), mode='edge')
+    rows, cols = pixels.shape[:2]
+    residual = np.zeros(pixels.shape, dtype=np.int16)
+    for (dr, dc), weight in np.ndenumerate(kernel):
+        if weight:
+            residual += weight * padded[dr:dr + rows, dc:dc + cols]
+    return residual
+
+
+def compute_features(pixels, features=FEATURES, lsb_bits=1):
+    """{feature: array} for one RGB uint8 image"""
+    result = {}
+    if 'rgb' in features:
+        result['rgb'] = pixels
+    if 'lsb' in features:
+        result['lsb'] = lsb_features(pixels, lsb_bits)
+    if 'residual' in features:
+        result['residual'] = high_pass_residual(pixels)
+    return result
+
+
+def feature_settings(feature, image_size, lsb_bits):
+    """The preprocessing settings one feature's arrays depend on"""
+    settings = {'feature': feature, 'version': FEATURE_VERSION, 'image_size': list(image_size)}
+    if feature == 'lsb':
+        settings['lsb_bits'] = lsb_bits
+    if feature == 'residual':
+        settings['kernel'] = RESIDUAL_KERNEL.tolist()
+    return settings
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def collect_sources(sources=DEFAULT_SOURCES, extensions=SOURCE_EXTENSIONS):
+    """(path, label) of every image under each (directory, label) source, sorted by path"""
+    items = []
+    for directory, label in sources:
+        for dirpath, dirnames, filenames in os.walk(directory):
+            items.extend((os.path.join(dirpath, name), int(label)) for name in filenames
+                         if name.lower().endswith(extensions))
+    return sorted(items)
+
+
+def content_hashes(paths, previous=None):
+    """
+    {path: [size, mtime_ns, sha256]} for every path. Files whose size and
+    mtime match the previous entry keep its hash, so only new or touched
+    files are read.
+    """
+    previous = previous or {}
+    hashes = {}
+    for path in paths:
+        stat = os.stat(path)
+        old = previous.get(path)
+        if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+            hashes[path] = old
+            continue
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        hashes[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return hashes
+
+
+def shard_of(path, num_shards):
+    """Shard of an image, from its path alone, so adding or removing files only touches their shards"""
+    return int.from_bytes(hashlib.sha1(path.encode('utf-8')).digest()[:8], 'big') % num_shards
+
+
+def plan_shards(items, hashes, num_shards):
+    """Shard plans: member (path, label, content hash) triples and an inputs key over all of them"""
+    members = [[] for _ in range(num_shards)]
+    for path, label in items:
+        members[shard_of(path, num_shards)].append((path, label, hashes[path][2]))
+    # Content-hash order mixes the classes, so contiguous (zero-copy) batches are not single-label
+    for shard in members:
+        shard.sort(key=lambda member: (member[2], member[0]))
+    return [{'index': i, 'members': m, 'inputs_key': _digest(m)} for i, m in enumerate(members)]
+
+
+def _shard_file(feature, key):
+    return f"{feature}-{key[:20]}.npy"
+
+
+def _save_atomic(path, array):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _build_shard(task):
+    """Decode one shard's images once and write every missing feature array; returns (index, kept paths, errors)"""
+    store_dir, shard, files, image_size, lsb_bits = task
+    outputs = {name: [] for name in files}
+    kept, labels, errors = [], [], []
+    for path, label, _ in shard['members']:
+        try:
+            pixels = read_rgb(path, image_size)
+        except Exception as e:
+            errors.append([path, str(e)])  # training_data skips undecodable images the same way
+            continue
+        for name, array in compute_features(pixels, [n for n in files if n != 'labels'], lsb_bits).items():
+            outputs[name].append(array)
+        kept.append(path)
+        labels.append(label)
+
+    for name, filename in files.items():
+        if name == 'labels':
+            array = np.asarray(labels, dtype=np.float32)
+        elif outputs[name]:
+            array = np.stack(outputs[name])
+        else:
+            array = np.zeros((0,), dtype=np.uint8)
+        _save_atomic(os.path.join(store_dir, filename), array)
+    return shard['index'], kept, errors
+
+
+def build_feature_store(store_dir, sources=DEFAULT_SOURCES, features=FEATURES, image_size=IMAGE_SIZE, lsb_bits=1,
+                        num_shards=None, workers=None):
+    """
+    Preprocess every source image once into sharded .npy feature arrays.
+
+    Images are assigned to shards by a hash of their path. Each shard's
+    arrays are named after a key over its members' content hashes and
+    labels plus the feature's settings, so a rebuild only recomputes the
+    shards whose files changed, and enabling a new feature only computes
+    that feature. num_shards is remembered from the first build
+    (changing it rebuilds everything). Unreferenced arrays are deleted.
+    Returns a summary dict.
+    """
+    start = time.perf_counter()
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+
+    items = collect_sources(sources)
+    if not items:
+        print("!!! Error: No images found.")
+        return None
+    hashes = content_hashes([path for path, _ in items], previous.get('file_hashes'))
+    num_shards = num_shards or previous.get('num_shards') or max(1, -(-len(items) // TARGET_SHARD_IMAGES))
+    settings_keys = {feature: _digest(feature_settings(feature, image_size, lsb_bits)) for feature in features}
+    old_shards = {s['inputs_key']: s for s in previous.get('shards', [])}
+
+    shards, tasks = [], []
+    for plan in plan_shards(items, hashes, num_shards):
+        if not plan['members']:
+            continue
+        key = plan['inputs_key']
+        files = {'labels': _shard_file('labels', key)}
+        files.update({feature: _shard_file(feature, _digest([key, settings_keys[feature]])) for feature in features})
+        missing = {name: filename for name, filename in files.items()
+                   if not os.path.exists(os.path.join(store_dir, filename))}
+        old = old_shards.get(key)
+        if old is None:
+            missing['labels'] = files['labels']  # which images decode is only known after a build
+        shard = {'index': plan['index'], 'inputs_key': key, 'files': files,
+                 'paths': old['paths'] if old else [], 'errors': old['errors'] if old else []}
+        shards.append(shard)
+        if missing:
+            tasks.append((store_dir, plan, missing, tuple(image_size), lsb_bits))
+
+    by_index = {shard['index']: shard for shard in shards}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, kept, errors in pool.map(_build_shard, tasks):
+            by_index[index].update(paths=kept, errors=errors)
+    for shard in shards:
+        shard['count'] = len(shard['paths'])
+
+    manifest = {
+        'num_shards': num_shards,
+        'features': list(features),
+        'settings': {feature: feature_settings(feature, image_size, lsb_bits) for feature in features},
+        'shards': shards,
+        'file_hashes': hashes,
+    }
+    _save_manifest(manifest_path, manifest)
+
+    referenced = {filename for shard in shards for filename in shard['files'].values()}
+    for name in os.listdir(store_dir):
+        if name.endswith('.npy') and name not in referenced:
+            os.remove(os.path.join(store_dir, name))
+
+    summary = {
+        'images': sum(shard['count'] for shard in shards),
+        'errors': sum(len(shard['errors']) for shard in shards),
+        'shards': len(shards),
+        'rebuilt': len(tasks),
+        'reused': len(shards) - len(tasks),
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+    print(f"Feature store {store_dir}: {summary['images']} images in {summary['shards']} shards, "
+          f"{summary['rebuilt']} rebuilt, {summary['reused']} reused, {summary['seconds']}s")
+    if summary['errors']:
+        print(f"!!! {summary['errors']} images could not be decoded and were skipped")
+    return summary
+
+
+def _save_manifest(path, manifest):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+class FeatureStore:
+    """
+    Read side of a built store. Shards are memory-mapped on first use, so
+    opening is instant and batches are views into the page cache: nothing
+    is decoded or copied until the model reads it.
+
+        store = FeatureStore("data/features")
+        for features, labels in store.iter_batches(32, ('residual',), shuffle=True, seed=epoch):
+            model.train_on_batch(features['residual'], labels)
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.features = manifest['features']
+        self.settings = manifest['settings']
+        self.shards = [shard for shard in manifest['shards'] if shard['count']]
+        self._arrays = {}
+
+    def __len__(self):
+        return sum(shard['count'] for shard in self.shards)
+
+    @property
+    def paths(self):
+        """Source path of every stored image, in store order"""
+        return [path for shard in self.shards for path in shard['paths']]
+
+    def shard_arrays(self, i, features=None):
+        """({feature: memmap}, labels memmap) of shard i"""
+        shard = self.shards[i]
+        names = list(features or self.features) + ['labels']
+        for name in names:
+            if (i, name) not in self._arrays:
+                self._arrays[(i, name)] = np.load(os.path.join(self.store_dir, shard['files'][name]), mmap_mode='r')
+        arrays = {name: self._arrays[(i, name)] for name in names}
+        return {name: arrays[name] for name in names[:-1]}, arrays['labels']
+
+    def iter_batches(self, batch_size, features=None, shuffle=False, seed=None):
+        """
+        Yield ({feature: array}, labels) batches of contiguous rows, which
+        are zero-copy memmap views. Batches never span two shards, so the
+        last batch of each shard may be smaller. shuffle randomises the shard
+        order and the batch order within each shard.
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        for i in order:
+            arrays, labels = self.shard_arrays(i, features)
+            starts = np.arange(0, len(labels), batch_size)
+            if shuffle:
+                rng.shuffle(starts)
+            for first in starts:
+                batch = slice(first, first + batch_size)
+                yield {name: array[batch] for name, array in arrays.items()}, labels[batch]
+
+
+def parse_source(text):
+    directory, _, label = text.rpartition(':')
+    if not directory:
+        raise argparse.ArgumentTypeError(f"{text}: expected DIR:LABEL")
+    return directory, int(label)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute memory-mapped training features")
+    parser.add_argument("store_dir", help="Feature store directory")
+    parser.add_argument("--source", type=parse_source, action='append', default=None, metavar="DIR:LABEL",
+                        help="Image folder and its label (default: data/linnaeus5:0 data/encoded_1x:1)")
+    parser.add_argument("--features", nargs='+', choices=FEATURES, default=list(FEATURES))
+    parser.add_argument("--image-size", type=int, nargs=2, default=IMAGE_SIZE, metavar=("ROWS", "COLS"))
+    parser.add_argument("--lsb-bits", type=int, default=1, help="Bit planes in the lsb feature")
+    parser.add_argument("--shards", type=int, default=None, help="Shard count (default: kept from the last build)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    build_feature_store(args.store_dir, args.source or DEFAULT_SOURCES, args.features, tuple(args.image_size),
+                        args.lsb_bits, args.shards, args.workers)
+
+
+if __name__ == "__main__":
+    main()
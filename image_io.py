@@ -0,0 +1,164 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Output formats that keep every bit of the pixels, by file extension
+LOSSLESS_FORMATS = {'.png': 'PNG', '.bmp': 'BMP', '.tif': 'TIFF', '.tiff': 'TIFF', '.npy': 'NPY'}
+FORMAT_EXTENSIONS = {'PNG': '.png', 'BMP': '.bmp', 'TIFF': '.tiff', 'NPY': '.npy'}
+
+# PIL's own default; 0-1 write several times faster for slightly larger files
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+
+
+def _is_npy(source):
+    return isinstance(source, (str, os.PathLike)) and str(source).lower().endswith('.npy')
+
+
+def probe_image(source):
+    """
+    (rows, cols, channels) of an image file, path or bytes buffer, read from
+    the header only: no pixel data is decoded.
+    """
+    if _is_npy(source):
+        shape = np.load(source, mmap_mode='r').shape  # maps the file, reads only the header
+        return (shape[0], shape[1], shape[2] if len(shape) > 2 else 1)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        return (img.height, img.width, len(img.getbands()))
+
+
+def read_image(source):
+    """Pixel array of a .npy file, an image file or path, or an encoded bytes buffer"""
+    if _is_npy(source):
+        return np.load(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        return np.array(img)
+
+
+def read_rgb(source, image_size=None):
+    """
+    RGB uint8 array of an image file, path or bytes buffer. With image_size
+    (rows, cols) a different-sized image is resized bilinearly with the same
+    TensorFlow op as training_data.decode_and_resize (imported only then).
+    PIL's decode matches decode_rgb's, JPEGs included, so both return the
+    same pixels; test_image_io checks the parity.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        pixels = np.asarray(img.convert('RGB'))
+    if image_size is not None and pixels.shape[:2] != tuple(image_size):
+        import tensorflow as tf
+        pixels = tf.cast(tf.round(tf.image.resize(pixels, image_size, method='bilinear')), tf.uint8).numpy()
+    return pixels
+
+
+def output_format(path, image_format=None):
+    """Lossless format name for an output path (or the explicit image_format); ValueError otherwise"""
+    if image_format is None:
+        image_format = LOSSLESS_FORMATS.get(os.path.splitext(str(path))[1].lower())
+        if image_format is None:
+            raise ValueError(f"{path}: not a lossless output format, use one of {sorted(LOSSLESS_FORMATS)}")
+    image_format = image_format.upper()
+    if image_format == 'TIF':
+        image_format = 'TIFF'
+    if image_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"{image_format} is not a lossless output format, use one of {sorted(FORMAT_EXTENSIONS)}")
+    return image_format
+
+
+def _save(pixels, target, image_format, compress_level):
+    if image_format == 'NPY':
+        np.save(target, np.asarray(pixels), allow_pickle=False)
+        return
+    options = {}
+    if image_format == 'PNG':
+        options['compress_level'] = DEFAULT_PNG_COMPRESS_LEVEL if compress_level is None else compress_level
+    image = pixels if isinstance(pixels, Image.Image) else Image.fromarray(np.asarray(pixels))
+    image.save(target, format=image_format, **options)
+
+
+def write_image(path, pixels, image_format=None, compress_level=None):
+    """
+    Write a pixel array (or PIL Image) losslessly. The format follows the
+    extension unless image_format is given: PNG (compress_level 0-9), BMP,
+    TIFF (uncompressed) or NPY. Lossy formats raise ValueError.
+    """
+    image_format = output_format(path, image_format)
+    if image_format == 'NPY':
+        with open(path, 'wb') as f:  # np.save would append .npy to any other extension
+            _save(pixels, f, image_format, compress_level)
+    else:
+        _save(pixels, path, image_format, compress_level)
+
+
+def image_to_bytes(pixels, image_format='PNG', compress_level=None):
+    """Encoded file contents for downloads and in-memory round trips"""
+    buf = io.BytesIO()
+    _save(pixels, buf, output_format(None, image_format), compress_level)
+    return buf.getvalue()
+
+
+class AsyncImageWriter:
+    """
+    Background image writer for batch jobs: submit() returns as soon as the
+    write is queued, so the caller can encode the next image while threads
+    compress and write (zlib and file I/O release the GIL). At most
+    max_pending writes are queued, bounding the pixel memory held, and
+    submit() blocks while the queue is full.
+
+        with AsyncImageWriter(workers=2) as writer:
+            for path, pixels in results:
+                writer.submit(path, pixels, compress_level=1)
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def _write(self, path, pixels, image_format, compress_level):
+        try:
+            write_image(path, pixels, image_format, compress_level)
+        except Exception as e:
+            with self._lock:
+                self._errors.append((path, e))
+            raise
+        finally:
+            self._slots.release()
+
+    def submit(self, path, pixels, image_format=None, compress_level=None):
+        """Queue one write and return its Future; the format is checked before queuing"""
+        output_format(path, image_format)
+        self._slots.acquire()
+        try:
+            return self._pool.submit(self._write, path, pixels, image_format, compress_level)
+        except Exception:
+            self._slots.release()
+            raise
+
+    @property
+    def errors(self):
+        """(path, exception) of every failed write so far"""
+        with self._lock:
+            return list(self._errors)
+
+    def close(self):
+        """Wait for every queued write"""
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
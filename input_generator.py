@@ -1,39 +1,42 @@
 import random
 import message_generator
 
-def generate_steganography_input(rows=256, columns=256):
+CHANNELS_OPTIONS = ['R', 'G', 'B', 'RG', 'RB', 'GB', 'RGB']
+
+DELIMITER_OPTIONS = [
+    ('#', '#'),           
+    ('##', '##'),         
+    ('***', '***'),      
+    ('[START]', '[END]'), 
+    ('<START>', '<END>'),
+    ('<<START>>', '<<END>>'),
+    ('<<', '>>'),         
+    ('{', '}'),          
+    ('|', '|'),        
+    ('+++', '+++'),    
+    ('BEGIN', 'END'), 
+    ('---', '---'),     
+    ('!!!', '!!!'),  
+    ('$$$', '$$$'),    
+    ('&&&', '&&&'),  
+    ('@@', '@@'),        ]
+
+def generate_steganography_input(rows=256, columns=256, rng=random):
+    # rng: a random.Random for an independent stream, the global random module by default
     
-    start_row = random.randint(0, int(rows * 0.50))
-    start_col = random.randint(0, int(columns * 0.50))
+    start_row = rng.randint(0, int(rows * 0.50))
+    start_col = rng.randint(0, int(columns * 0.50))
     start_position = (start_row, start_col)
     
-    num_bits = random.randint(1, 8)
-    
-    channels_options = ['R', 'G', 'B', 'RG', 'RB', 'GB', 'RGB']
-    channels = random.choice(channels_options)
-    
-    gap = random.randint(0, 5)
-    
-    horizontal = random.choice([0, 1])
-    
-    delimiter_options = [
-        ('#', '#'),           
-        ('##', '##'),         
-        ('***', '***'),      
-        ('[START]', '[END]'), 
-        ('<START>', '<END>'),
-        ('<<START>>', '<<END>>'),
-        ('<<', '>>'),         
-        ('{', '}'),          
-        ('|', '|'),        
-        ('+++', '+++'),    
-        ('BEGIN', 'END'), 
-        ('---', '---'),     
-        ('!!!', '!!!'),  
-        ('$$$', '$$$'),    
-        ('&&&', '&&&'),  
-        ('@@', '@@'),        ]
-    delimiter_start, delimiter_end = random.choice(delimiter_options)
+    num_bits = rng.randint(1, 8)
+    
+    channels = rng.choice(CHANNELS_OPTIONS)
+    
+    gap = rng.randint(0, 5)
+    
+    horizontal = rng.choice([0, 1])
+    
+    delimiter_start, delimiter_end = rng.choice(DELIMITER_OPTIONS)
     
     bits_per_pixel = len(channels) * num_bits
     
@@ -68,14 +71,14 @@ def generate_steganography_input(rows=256, columns=256):
     min_length = max(1, int(safe_max_characters * 0.60))
     max_length = max(min_length, int(safe_max_characters * 0.90))  
     
-    message_length = random.randint(min_length, max_length)
-    message = message_generator.generate_message_by_length(message_length)
+    message_length = rng.randint(min_length, max_length)
+    message = message_generator.generate_message_by_length(message_length, rng)
     actual_message_length = len(message)
     
     required_bits = (actual_message_length * 8) + delimiter_bits + padding_safety_bits
     if required_bits > available_bits:
         fallback_max_chars = max(1, (available_bits - delimiter_bits - padding_safety_bits) // 8 - 1)
-        message = message_generator.generate_message_by_length(fallback_max_chars)
+        message = message_generator.generate_message_by_length(fallback_max_chars, rng)
         actual_message_length = len(message)
     
     return {
@@ -0,0 +1,224 @@
+"""
+Opt-in timing spans and counters for the encode/decode hot path.
+
+Nothing is recorded until a sink is added with add_sink() or a collect()
+block is open; until then span() hands back a shared no-op context manager
+and count() returns immediately.
+
+    with collect() as stages:
+        encode_message('cover.png', 'out.png', 'hello')
+    print(stages.breakdown())
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_sinks = []
+_active_collections = 0
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _update_enabled():
+    global _enabled
+    _enabled = bool(_sinks) or _active_collections > 0
+
+
+def enabled():
+    return _enabled
+
+
+def add_sink(sink):
+    """Send every span and counter from now on to sink (returns the sink)"""
+    with _lock:
+        _sinks.append(sink)
+        _update_enabled()
+    return sink
+
+
+def remove_sink(sink):
+    with _lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+        _update_enabled()
+
+
+def clear_sinks():
+    with _lock:
+        _sinks.clear()
+        _update_enabled()
+
+
+def _targets():
+    return _sinks + getattr(_local, 'collectors', [])
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        for sink in _targets():
+            sink.record_span(self.name, seconds)
+        return False
+
+
+def span(name):
+    """Context manager timing one stage, e.g. with span('encode.embed'): ..."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+
+def count(name, value=1):
+    """Add value to the counter name"""
+    if not _enabled:
+        return
+    for sink in _targets():
+        sink.record_count(name, value)
+
+
+class MemorySink:
+    """Aggregates span time, span calls and counters in memory"""
+
+    def __init__(self):
+        self.span_seconds = defaultdict(float)
+        self.span_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record_span(self, name, seconds):
+        with self._lock:
+            self.span_seconds[name] += seconds
+            self.span_calls[name] += 1
+
+    def record_count(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def totals(self):
+        """Plain dict of everything recorded, picklable for worker processes"""
+        return {
+            'spans': {name: (self.span_calls[name], seconds) for name, seconds in self.span_seconds.items()},
+            'counters': dict(self.counters),
+        }
+
+    def merge(self, totals):
+        """Add the totals() of another sink, e.g. one filled in a worker process"""
+        with self._lock:
+            for name, (calls, seconds) in totals['spans'].items():
+                self.span_seconds[name] += seconds
+                self.span_calls[name] += calls
+            for name, value in totals['counters'].items():
+                self.counters[name] += value
+
+    def breakdown(self):
+        """One row per stage in first-seen order: calls, total ms and share of the recorded time"""
+        total = sum(self.span_seconds.values())
+        return [{'stage': name, 'calls': self.span_calls[name], 'ms': round(seconds * 1000, 3),
+                 'share': round(seconds / total, 3) if total else 0.0}
+                for name, seconds in self.span_seconds.items()]
+
+    def format(self):
+        lines = [f"{row['stage']:<20} {row['calls']:>7} calls {row['ms']:>11.1f} ms {row['share']:>7.1%}"
+                 for row in self.breakdown()]
+        lines += [f"{name:<20} {value:>12}" for name, value in self.counters.items()]
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.span_seconds.clear()
+            self.span_calls.clear()
+            self.counters.clear()
+
+
+class LoggingSink:
+    """Logs every span and counter increment"""
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger('stego.instrumentation')
+        self.level = level
+
+    def record_span(self, name, seconds):
+        self.logger.log(self.level, "span %s %.3f ms", name, seconds * 1000)
+
+    def record_count(self, name, value):
+        self.logger.log(self.level, "count %s +%d", name, value)
+
+
+class PrometheusSink(MemorySink):
+    """
+    MemorySink rendered in the Prometheus text exposition format: stage
+    time as a <prefix>_stage_seconds summary (sum and count) and every
+    counter as <prefix>_<name>_total.
+    """
+
+    def __init__(self, prefix='stego'):
+        super().__init__()
+        self.prefix = prefix
+
+    def render(self):
+        with self._lock:
+            lines = [f"# HELP {self.prefix}_stage_seconds Time spent per encode/decode stage",
+                     f"# TYPE {self.prefix}_stage_seconds summary"]
+            for name, seconds in self.span_seconds.items():
+                lines.append(f'{self.prefix}_stage_seconds_sum{{stage="{name}"}} {seconds:.6f}')
+                lines.append(f'{self.prefix}_stage_seconds_count{{stage="{name}"}} {self.span_calls[name]}')
+            for name, value in self.counters.items():
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics atomically, e.g. for the node_exporter textfile collector"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+@contextmanager
+def collect():
+    """
+    Record the spans and counters of the current thread inside the block
+    into a fresh MemorySink, for per-request stage breakdowns.
+    """
+    global _active_collections
+    sink = MemorySink()
+    collectors = _local.__dict__.setdefault('collectors', [])
+    collectors.append(sink)
+    with _lock:
+        _active_collections += 1
+        _update_enabled()
+    try:
+        yield sink
+    finally:
+        collectors.remove(sink)
+        with _lock:
+            _active_collections -= 1
+            _update_enabled()
@@ -0,0 +1,266 @@
+import argparse
+import csv
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stego_keys.db')
+DEFAULT_CACHE_SIZE = 4096
+IMPORT_BATCH_ROWS = 10_000
+# Generated manifests hold far too many rows for 8-character keys to stay collision-free
+MANIFEST_KEY_LENGTH = 32
+
+# Everything needed to decode, plus the bookkeeping fields of the dataset manifests.
+# The message itself is never stored.
+COLUMNS = [
+    ('key', 'TEXT PRIMARY KEY'),
+    ('start_row', 'INTEGER NOT NULL'),
+    ('start_col', 'INTEGER NOT NULL'),
+    ('gap', 'INTEGER NOT NULL'),
+    ('channels', 'TEXT NOT NULL'),
+    ('num_bits', 'INTEGER NOT NULL'),
+    ('delimiter_start', 'TEXT NOT NULL'),
+    ('delimiter_end', 'TEXT NOT NULL'),
+    ('horizontal', 'INTEGER NOT NULL'),
+    ('message_length', 'INTEGER'),
+    ('max_possible_length', 'INTEGER'),
+    ('utilization_percent', 'REAL'),
+    ('image', 'TEXT'),  # file name of the cover the parameters were used on
+    ('created', 'TEXT'),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+# One key per cover and parameter set, so importing a manifest twice adds nothing
+UNIQUE_COLUMNS = ['image', 'start_row', 'start_col', 'gap', 'channels', 'num_bits',
+                  'delimiter_start', 'delimiter_end', 'horizontal', 'message_length']
+UNIQUE_POSITIONS = [COLUMN_NAMES.index(name) for name in UNIQUE_COLUMNS]
+
+
+def new_key(length=8):
+    """Random hex key, by default 8 characters in the same format the app has always shown"""
+    return uuid.uuid4().hex[:length]
+
+
+def params_to_record(params, key, image=None):
+    """Registry row for a generate_steganography_input-style parameter dict"""
+    start_row, start_col = params['start_position']
+    return (key, int(start_row), int(start_col), int(params['gap']), params['channels'],
+            int(params['num_bits']), params['delimiter_start'], params['delimiter_end'],
+            int(params['horizontal']), params.get('message_length'), params.get('max_possible_length'),
+            params.get('utilization_percent'), image, datetime.now().isoformat())
+
+
+def manifest_row_to_record(row, key=None):
+    """Registry row for one row of an encoding_params_{N}x.csv manifest (key derived when None)"""
+    def number(name, cast):
+        value = row.get(name)
+        return cast(value) if value not in (None, '') else None
+
+    record = (key, int(row['start_row']), int(row['start_col']), int(row['gap']), row['channels'],
+              int(row['num_bits']), row['delimiter_start'], row['delimiter_end'],
+              int(float(row['horizontal'])), number('message_length', int), number('max_possible_length', int),
+              number('utilization_percent', float), row.get('original_image'),
+              row.get('timestamp') or datetime.now().isoformat())
+    return record if key else (derived_key(record),) + record[1:]
+
+
+def derived_key(record):
+    """
+    16-character key computed from a record's cover and parameters, for
+    manifest rows without a 'key' column: re-importing yields the same key,
+    and it can be recomputed from the manifest with manifest_row_to_record.
+    """
+    identity = repr([record[i] for i in UNIQUE_POSITIONS]).encode('utf-8')
+    return hashlib.sha256(identity).hexdigest()[:16]
+
+
+def record_to_params(record):
+    """Parameter dict (decode_message keyword names) from a registry row"""
+    row = dict(zip(COLUMN_NAMES, record))
+    return {
+        'key': row['key'],
+        'start_position': (row['start_row'], row['start_col']),
+        'gap': row['gap'],
+        'channels': row['channels'],
+        'num_bits': row['num_bits'],
+        'delimiter_start': row['delimiter_start'],
+        'delimiter_end': row['delimiter_end'],
+        'horizontal': row['horizontal'],
+        'message_length': row['message_length'],
+        'max_possible_length': row['max_possible_length'],
+        'utilization_percent': row['utilization_percent'],
+        'image': row['image'],
+    }
+
+
+class KeyRegistry:
+    """
+    Persistent key -> encoding parameters store.
+
+    Keys live in a SQLite table whose primary key index makes lookups
+    independent of the registry size; WAL mode lets several processes
+    (app sessions, dataset workers) read while one writes. Recently used
+    keys are served from an in-process LRU cache.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, cache_size=DEFAULT_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS keys ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS keys_image ON keys (image)")
+        self._conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS keys_params ON keys ({', '.join(UNIQUE_COLUMNS)})")
+        self._conn.commit()
+
+    def _remember(self, key, params):
+        self._cache[key] = params
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def register(self, params, key=None, image=None):
+        """
+        Store params for the cover file name image under key (a fresh one if
+        None) and return the key. Parameters already registered for the same
+        cover keep their existing key.
+        """
+        with self._lock:
+            while True:
+                candidate = key or new_key()
+                record = params_to_record(params, candidate, image)
+                try:
+                    with self._conn:
+                        self._conn.execute(f"INSERT INTO keys VALUES ({', '.join('?' * len(COLUMNS))})", record)
+                    break
+                except sqlite3.IntegrityError:
+                    existing = self._existing_key(record)
+                    if existing is not None:
+                        return existing
+                    if key is not None:
+                        print(f"!!! Error: Key {key} is already registered.")
+                        return None
+            self._cache.pop(candidate, None)
+        return candidate
+
+    def _existing_key(self, record):
+        # Key of the row holding the same cover and parameters, or None
+        found = self._conn.execute(f"SELECT key FROM keys WHERE {' AND '.join(f'{n} IS ?' for n in UNIQUE_COLUMNS)}",
+                                   [record[i] for i in UNIQUE_POSITIONS]).fetchone()
+        return found[0] if found else None
+
+    def lookup(self, key):
+        """Parameters registered under key, or None"""
+        key = key.strip()
+        with self._lock:
+            params = self._cache.get(key)
+            if params is not None:
+                self._cache.move_to_end(key)
+                return dict(params)
+
+            record = self._conn.execute(f"SELECT {', '.join(COLUMN_NAMES)} FROM keys WHERE key = ?",
+                                        (key,)).fetchone()
+            if record is None:
+                return None  # misses are not cached, another process may register the key later
+            params = record_to_params(record)
+            self._remember(key, params)
+            return dict(params)
+
+    def lookup_image(self, image_name):
+        """Parameters of every key registered for a cover image file name"""
+        with self._lock:
+            records = self._conn.execute(f"SELECT {', '.join(COLUMN_NAMES)} FROM keys WHERE image = ?",
+                                         (os.path.basename(image_name),)).fetchall()
+        return [record_to_params(r) for r in records]
+
+    def import_manifest(self, csv_path, batch_rows=IMPORT_BATCH_ROWS):
+        """
+        Bulk-load an encoding_params_{N}x.csv manifest, batch_rows rows per
+        transaction. Rows with a 'key' column keep their key; rows without
+        one get derived_key(), so re-importing a manifest adds nothing.
+        Rows already registered under the same key, cover and parameters
+        are skipped. A key that is registered for other parameters, or
+        parameters registered under another key, raise ValueError (the
+        batch holding that row is rolled back). Returns the number of keys
+        added.
+        """
+        added = 0
+        with open(csv_path, newline='', encoding='utf-8') as f, self._lock:
+            reader = csv.DictReader(f)
+            batch = []
+            for row in reader:
+                batch.append(manifest_row_to_record(row, row.get('key')))
+                if len(batch) >= batch_rows:
+                    added += self._insert_many(batch)
+                    batch = []
+            if batch:
+                added += self._insert_many(batch)
+        return added
+
+    def _insert_many(self, records):
+        added = 0
+        with self._conn:
+            for record in records:
+                try:
+                    self._conn.execute(f"INSERT INTO keys VALUES ({', '.join('?' * len(COLUMNS))})", record)
+                    added += 1
+                except sqlite3.IntegrityError:
+                    if self._existing_key(record) != record[0]:
+                        raise ValueError(f"Key {record[0]} of {record[COLUMN_NAMES.index('image')]} conflicts "
+                                         f"with a registered key") from None
+        return added
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_registry = None
+
+
+def get_registry():
+    # Shared registry on the default database, opened on first use
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = KeyRegistry()
+    return _default_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the steganography key registry")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Registry database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Import encoding_params_{N}x.csv manifests")
+    import_parser.add_argument("manifests", nargs='+')
+    lookup_parser = commands.add_parser("lookup", help="Print the parameters of a key")
+    lookup_parser.add_argument("key")
+    args = parser.parse_args()
+
+    registry = KeyRegistry(args.db)
+    if args.command == "import":
+        for path in args.manifests:
+            try:
+                print(f"{path}: {registry.import_manifest(path)} keys added")
+            except ValueError as e:
+                print(f"!!! Error: {path}: {e}")
+        print(f"Registry holds {len(registry)} keys")
+    else:
+        params = registry.lookup(args.key)
+        print(params if params is not None else f"!!! Key {args.key} not found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def value_nbytes(value):
+    """Approximate memory held by a cached value (arrays count their buffer)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(value_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryBoundedLRU:
+    """
+    Least-recently-used cache that evicts by total size instead of entry
+    count. Values larger than the whole budget are returned to the caller
+    but never stored. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = value_nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def get_or_create(self, key, create):
+        """Cached value for key, calling create() and caching its result on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, create())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
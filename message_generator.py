@@ -1,4 +1,14 @@
+import bisect
+import os
+import random
+
 import lorem
+from lorem.text import TextLorem
+
+# Size of the cached Lorem Ipsum corpus messages are cut from
+CORPUS_CHARACTERS = 1_000_000
+CORPUS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
 
 def generate_message_by_words(word_count):
 
@@ -20,36 +30,136 @@ def generate_message_by_words(word_count):
 
     return sentence
 
-def generate_message_by_length(length):
+
+def build_corpus(size=CORPUS_CHARACTERS, seed=0):
+    # Generate at least `size` characters of single-line Lorem Ipsum, reproducible for a given seed
+
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        generator = TextLorem(psep=' ')
+        parts, total = [], 0
+        while total < size:
+            part = generator.text()
+            parts.append(part)
+            total += len(part) + 1
+    finally:
+        random.setstate(state)  # lorem draws from the global generator, leave it as we found it
+
+    return ' '.join(parts)
+
+
+def load_corpus(size=CORPUS_CHARACTERS, seed=0, cache_dir=CORPUS_CACHE_DIR):
+    # Read the corpus from the disk cache, building and caching it on first use
+
+    cache_path = os.path.join(cache_dir, f"lorem_corpus_{seed}_{size}.txt") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, encoding='ascii') as f:
+            return f.read()
+
+    corpus = build_corpus(size, seed)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write(corpus)
+        os.replace(tmp_path, cache_path)  # atomic, concurrent workers never see a partial file
+
+    return corpus
+
+
+class MessagePool:
+    """
+    Cuts Lorem Ipsum messages of a requested length out of one cached corpus.
+
+    Each message starts at a random word of the corpus and is snapped to a
+    word boundary the same way generate_message_by_length always did. With
+    seed=None the global `random` module is used, so random.seed() makes
+    the messages reproducible; pass a seed for an independent stream.
+    """
+
+    def __init__(self, corpus_size=CORPUS_CHARACTERS, seed=None, corpus_seed=0, cache_dir=CORPUS_CACHE_DIR):
+        self.corpus = load_corpus(corpus_size, corpus_seed, cache_dir)
+        self.rng = random if seed is None else random.Random(seed)
+        self.spaces = [i for i, c in enumerate(self.corpus) if c == ' ']
+        self.word_starts = [0] + [i + 1 for i in self.spaces]
+
+    def _text_of_length(self, length, rng):
+        # Corpus text starting at a random word, at least `length` characters long when possible
+
+        corpus = self.corpus
+        if length >= len(corpus):
+            repeats = length // (len(corpus) + 1) + 1
+            return ' '.join([corpus] * repeats), None, 0
+
+        # Only words that still leave `length` characters after them
+        last = bisect.bisect_right(self.word_starts, len(corpus) - length) - 1
+        start = self.word_starts[rng.randint(0, last)]
+        return corpus, self.spaces, start
+
+    def message_by_length(self, length, rng=None):
+        # Generate an English message with specified character length (rng overrides the pool's generator)
+
+        if length <= 0:
+            return ""
+
+        text, spaces, start = self._text_of_length(length, rng or self.rng)
+
+        if len(text) - start <= length:
+            message = text[start:]
+        else:
+            # Try to cut at a word boundary
+            truncated = text[start:start + length]
+            if spaces is not None:
+                idx = bisect.bisect_left(spaces, start + length) - 1
+                last_space = spaces[idx] - start if idx >= 0 and spaces[idx] >= start else -1
+            else:
+                last_space = truncated.rfind(' ')
+
+            if last_space > length * 0.8:  # If we can cut at a word boundary without losing too much
+                message = truncated[:last_space]
+            else:
+                message = truncated
+
+        message = message.strip()
+        if message:
+            message = message[0].upper() + message[1:]
+            if not message.endswith('.'):
+                message += '.'
+
+        return message
+
+    def messages_by_length(self, lengths, rng=None):
+        # Batched version for dataset workers: one message per requested length, in order
+
+        rng = rng or self.rng
+        return [self.message_by_length(length, rng) for length in lengths]
+
+
+_default_pool = None
+
+
+def get_message_pool():
+    # Shared pool, created on first use so importing this module stays cheap
+
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = MessagePool()
+    return _default_pool
+
+
+def generate_message_by_length(length, rng=None):
     # Generate an English message with specified character length using Lorem Ipsum
 
     if length <= 0:
         return ""
-    
-    text = lorem.text()
-    while len(text) < length:
-        text += " " + lorem.text()
-    
-    if len(text) <= length:
-        message = text
-    else:
-        # Try to cut at a word boundary
-        truncated = text[:length]
-        last_space = truncated.rfind(' ')
-        
-        if last_space > length * 0.8:  # If we can cut at a word boundary without losing too much
-            message = truncated[:last_space]
-        else:
-            message = truncated
-    
-    message = message.strip()
-    if message:
-        message = message[0].upper() + message[1:]
-        if not message.endswith('.'):
-            message += '.'
-    
-    return message
+    return get_message_pool().message_by_length(length, rng)
+
+
+def generate_messages_by_length(lengths, rng=None):
+    # Generate one message per entry of `lengths` in a single call
 
+    return get_message_pool().messages_by_length(lengths, rng)
 
 
 # print(generate_message_by_words(10))  # Example usage
@@ -60,4 +170,4 @@ def generate_message_by_length(length):
 
 if __name__ == "__main__":
     print(f'message of 5 words: {generate_message_by_words(5)}')
-    print(f'message of 50 characters: {generate_message_by_length(50)}')
\ No newline at end of file
+    print(f'message of 50 characters: {generate_message_by_length(50)}')
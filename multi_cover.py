@@ -0,0 +1,235 @@
+import argparse
+import os
+import random
+import struct
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from encode_decode import (FRAME_HEADER, decode_message, encode_message, frame_payload, message_capacity,
+                           parse_frame_header, unframe_payload)
+from image_io import probe_image
+
+# Shard header: magic, set id, shard index, data shards, parity group size (0 = no parity),
+# framed payload length and CRC-32 of the shard data
+SHARD_MAGIC = b'MC'
+SHARD_HEADER = struct.Struct('>2sIHHHQI')
+
+
+def shard_capacity(shape, start_position=(0, 0), gap=0, channels='RGB', num_bits=1, horizontal=1):
+    """Shard data bytes one cover of the given shape can carry"""
+    rows, cols = shape[:2]
+    frame_bytes = message_capacity(rows, cols, start_position, gap, channels, num_bits, horizontal=horizontal,
+                                   framing='binary')
+    return max(0, frame_bytes - SHARD_HEADER.size)
+
+
+def shard_counts(cover_count, parity_group=0):
+    """(data shards, parity shards) that fit on cover_count covers, one parity shard per parity_group data shards"""
+    if not parity_group:
+        return cover_count, 0
+    data = cover_count
+    while data > 0 and data + -(-data // parity_group) > cover_count:
+        data -= 1
+    return data, -(-data // parity_group)
+
+
+def _xor(chunks):
+    result = np.zeros(len(chunks[0]), dtype=np.uint8)
+    for chunk in chunks:
+        result ^= np.frombuffer(chunk, dtype=np.uint8)
+    return result.tobytes()
+
+
+def split_payload(payload, data_shards, parity_group=0, set_id=None):
+    """
+    Cut a payload into data_shards equal chunks (the last zero-padded) plus
+    one XOR parity chunk per parity_group data chunks. Returns the shards
+    as bytes, each starting with SHARD_HEADER, data shards first.
+    """
+    set_id = random.getrandbits(32) if set_id is None else set_id
+    size = max(1, -(-len(payload) // data_shards))
+    chunks = [payload[i * size:(i + 1) * size].ljust(size, b'\0') for i in range(data_shards)]
+    if parity_group:
+        chunks += [_xor(chunks[i:i + parity_group]) for i in range(0, data_shards, parity_group)]
+
+    return [SHARD_HEADER.pack(SHARD_MAGIC, set_id, index, data_shards, parity_group, len(payload),
+                              zlib.crc32(chunk)) + chunk
+            for index, chunk in enumerate(chunks)]
+
+
+def parse_shard(data):
+    """Header fields and chunk of one decoded shard, or None if it is not an intact shard"""
+    if not isinstance(data, bytes) or len(data) < SHARD_HEADER.size:
+        return None
+    magic, set_id, index, data_shards, parity_group, length, crc = SHARD_HEADER.unpack(data[:SHARD_HEADER.size])
+    chunk = data[SHARD_HEADER.size:]
+    if magic != SHARD_MAGIC or zlib.crc32(chunk) != crc:
+        return None
+    return {'set_id': set_id, 'index': index, 'data_shards': data_shards, 'parity_group': parity_group,
+            'length': length, 'chunk': chunk}
+
+
+def reassemble(shards):
+    """
+    Payload bytes from parsed shards in any order, rebuilding at most one
+    missing data shard per parity group. Returns None if too many are lost.
+    """
+    shards = [s for s in shards if s is not None]
+    if not shards:
+        print("!!! Error: No shards found.")
+        return None
+
+    # Covers from an unrelated set are ignored
+    set_id = Counter(s['set_id'] for s in shards).most_common(1)[0][0]
+    shards = [s for s in shards if s['set_id'] == set_id]
+    data_shards, parity_group, length = shards[0]['data_shards'], shards[0]['parity_group'], shards[0]['length']
+    chunks = {s['index']: s['chunk'] for s in shards}
+
+    for i in range(data_shards):
+        if i in chunks:
+            continue
+        group = i // parity_group if parity_group else None
+        parity = chunks.get(data_shards + group) if group is not None else None
+        members = range(group * parity_group, min((group + 1) * parity_group, data_shards)) if parity else ()
+        if parity is None or any(m != i and m not in chunks for m in members):
+            print(f"!!! Error: Shard {i} of {data_shards} is missing and cannot be rebuilt.")
+            return None
+        chunks[i] = _xor([parity] + [chunks[m] for m in members if m != i])
+
+    return b''.join(chunks[i] for i in range(data_shards))[:length]
+
+
+def _embed_shard(task):
+    cover_path, out_path, shard, params = task
+    return encode_message(cover_path, out_path, shard, framing='binary', **params)
+
+
+def _decode_shard(task):
+    path, params = task
+    try:
+        return parse_shard(decode_message(path, framing='binary', **params))
+    except Exception:
+        return None
+
+
+def encode_multi_cover(cover_paths, out_dir, message, start_position=(0, 0), gap=0, channels='RGB',
+                       num_bits=1, horizontal=1, parity_group=0, compression=None, key=None,
+                       compress_level=None, workers=None):
+    """
+    Hide one message (str or bytes) across several covers.
+
+    The message is framed like framing='binary' (optionally compressed),
+    cut into equal shards and one shard is embedded per cover in a process
+    pool. With parity_group=g every g data shards get an XOR parity shard,
+    so one lost cover per group can be tolerated. Every cover shares the
+    same embedding parameters. Returns the written paths in shard order,
+    or None if the message does not fit.
+    """
+    channels = channels.upper()
+    data_count, parity_count = shard_counts(len(cover_paths), parity_group)
+    if data_count == 0:
+        print("!!! Error: Not enough covers for one data shard.")
+        return None
+
+    payload = frame_payload(message, compression)
+    shard_size = -(-len(payload) // data_count)
+    used = cover_paths[:data_count + parity_count]
+    capacity = min(shard_capacity(probe_image(path), start_position, gap, channels, num_bits, horizontal)
+                   for path in used)
+    if shard_size > capacity:
+        print(f"!!! Error: Message is too large. {data_count} shards of {shard_size} bytes needed, "
+              f"the smallest cover holds {capacity} bytes.")
+        return None
+
+    os.makedirs(out_dir, exist_ok=True)
+    shards = split_payload(payload, data_count, parity_group)
+    params = dict(start_position=start_position, gap=gap, channels=channels, num_bits=num_bits,
+                  horizontal=horizontal, key=key, compress_level=compress_level)
+    out_paths = [os.path.join(out_dir, f"shard_{i:03d}_{os.path.splitext(os.path.basename(p))[0]}.png")
+                 for i, p in enumerate(used)]
+    tasks = [(cover, out, shard, params) for cover, out, shard in zip(used, out_paths, shards)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_embed_shard, tasks))
+
+    if not all(results):
+        print("!!! Error: Embedding failed for " + ", ".join(p for p, ok in zip(used, results) if not ok))
+        return None
+    return out_paths
+
+
+def decode_multi_cover(stego_paths, start_position=(0, 0), gap=0, channels='RGB', num_bits=1,
+                       horizontal=1, key=None, workers=None):
+    """
+    Decode the shards of every image in a process pool and reassemble the
+    message. Images may come in any order; missing or damaged shards are
+    rebuilt from parity where possible. Returns the message (str or bytes)
+    or None.
+    """
+    params = dict(start_position=start_position, gap=gap, channels=channels.upper(), num_bits=num_bits,
+                  horizontal=horizontal, key=key)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = list(pool.map(_decode_shard, [(path, params) for path in stego_paths]))
+
+    payload = reassemble(shards)
+    if payload is None:
+        return None
+    parsed = parse_frame_header(payload)
+    if parsed is None:
+        print("!!! Error: Reassembled payload is not a valid frame.")
+        return None
+    flags, length = parsed
+    return unframe_payload(flags, payload[FRAME_HEADER.size:FRAME_HEADER.size + length])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hide one file or message across several cover images")
+    commands = parser.add_subparsers(dest="command", required=True)
+    encode_parser = commands.add_parser("encode", help="Shard a payload across covers")
+    encode_parser.add_argument("covers", nargs='+')
+    encode_parser.add_argument("--out-dir", required=True)
+    payload_group = encode_parser.add_mutually_exclusive_group(required=True)
+    payload_group.add_argument("--message")
+    payload_group.add_argument("--file", help="Binary file to hide")
+    encode_parser.add_argument("--parity-group", type=int, default=0, help="Data shards per XOR parity shard")
+    encode_parser.add_argument("--compression", choices=['zlib', 'lzma'], default=None)
+    decode_parser = commands.add_parser("decode", help="Reassemble a payload from stego images")
+    decode_parser.add_argument("images", nargs='+')
+    decode_parser.add_argument("--output", default=None, help="Write the payload to this file")
+    for sub in (encode_parser, decode_parser):
+        sub.add_argument("--start", type=int, nargs=2, default=(0, 0), metavar=("ROW", "COL"))
+        sub.add_argument("--gap", type=int, default=0)
+        sub.add_argument("--channels", default='RGB')
+        sub.add_argument("--num-bits", type=int, default=1)
+        sub.add_argument("--vertical", action='store_true')
+        sub.add_argument("--key", default=None, help="Keyed traversal secret")
+        sub.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    params = dict(start_position=tuple(args.start), gap=args.gap, channels=args.channels,
+                  num_bits=args.num_bits, horizontal=0 if args.vertical else 1, key=args.key)
+    if args.command == "encode":
+        message = args.message
+        if args.file:
+            with open(args.file, 'rb') as f:
+                message = f.read()
+        paths = encode_multi_cover(args.covers, args.out_dir, message, parity_group=args.parity_group,
+                                   compression=args.compression, workers=args.workers, **params)
+        if paths:
+            print(f"Wrote {len(paths)} stego images to {args.out_dir}")
+    else:
+        message = decode_multi_cover(args.images, workers=args.workers, **params)
+        if message is None:
+            return
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(message.encode('utf-8') if isinstance(message, str) else message)
+        else:
+            print(message)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,56 @@
 import streamlit as st
 from PIL import Image
 import numpy as np
-import io
-import uuid
+import hashlib
+import os
 import input_generator
-from encode_decode import decode_message, encode_message
+import blind_search
+import stego_scanner
+from key_registry import get_registry
+from encode_decode import check_parameters, decode_planes, encode_pil, lsb_planes
+from image_io import FORMAT_EXTENSIONS, image_to_bytes, read_image, read_rgb
+from instrumentation import collect
+from memory_cache import MemoryBoundedLRU
+
+DOWNLOAD_MIME_TYPES = {'PNG': 'image/png', 'BMP': 'image/bmp', 'TIFF': 'image/tiff'}
+
+# Memory shared by all sessions for decoded pixels, LSB planes and CNN scores
+ARRAY_CACHE_BYTES = 512 * 1024 * 1024
+# Peak memory one blind search may use across its worker processes
+BLIND_SEARCH_MEMORY_BYTES = 2 * 1024 * 1024 * 1024
+MODEL_PATH = stego_scanner.MODEL_PATH
+
+@st.cache_resource
+def get_array_cache():
+    # Entries are keyed by the SHA-256 of the image file, so reruns and sessions share them
+    return MemoryBoundedLRU(ARRAY_CACHE_BYTES)
+
+@st.cache_resource(show_spinner="Loading the detector model...")
+def get_detector_model(model_path=MODEL_PATH):
+    if not os.path.exists(model_path):
+        return None
+    return stego_scanner.load_model(model_path)
+
+def cached_pixels(image_bytes):
+    # (content hash, read-only pixel array) of an encoded image file, decoded once
+    digest = hashlib.sha256(image_bytes).hexdigest()
+
+    def load():
+        pixels = read_image(image_bytes)
+        pixels.setflags(write=False)
+        return pixels
+
+    return digest, get_array_cache().get_or_create(('pixels', digest), load)
+
+def cached_lsb_planes(digest, pixels, channels, num_bits):
+    return get_array_cache().get_or_create(('planes', digest, channels, num_bits),
+                                           lambda: lsb_planes(pixels, channels, num_bits))
 
 def encode_image(image, message, params):
-    # Save the uploaded image to a temporary file
-    temp_in = "temp_input.png"
-    temp_out = "temp_encoded.png"
-    image.save(temp_in)
-    # Call the real encode_message function
-    success = encode_message(
-        img_path=temp_in,
-        out_path=temp_out,
-        message=message,
+    # Encode directly in memory, nothing is written to disk
+    return encode_pil(
+        image,
+        message,
         start_position=params['start_position'],
         gap=params['gap'],
         channels=params['channels'],
@@ -24,24 +59,22 @@ def encode_image(image, message, params):
         delimiter_end=params['delimiter_end'],
         horizontal=params['horizontal']
     )
-    if not success:
-        return None
-    return Image.open(temp_out)
 
-def detect_hidden_message(image, key_params):
-    # Save the uploaded image to a temporary file for decoding
-    temp_path = "temp_uploaded.png"
-    image.save(temp_path)
+def detect_hidden_message(digest, pixels, key_params):
+    # Decode from the cached LSB planes of the image, only the traversal changes between attempts
     try:
-        msg = decode_message(
-            img_path=temp_path,
+        channels = key_params['channels'].upper()
+        num_bits = int(key_params['num_bits'])
+        if not check_parameters(channels, num_bits, int(key_params['horizontal'])):
+            return False, ""
+        msg = decode_planes(
+            cached_lsb_planes(digest, pixels, channels, num_bits),
+            pixels.shape,
             start_position=key_params['start_position'],
             gap=key_params['gap'],
-            channels=key_params['channels'],
-            num_bits=key_params['num_bits'],
             delimiter_start=key_params['delimiter_start'],
             delimiter_end=key_params['delimiter_end'],
-            horizontal=key_params['horizontal']
+            horizontal=int(key_params['horizontal'])
         )
         if msg and all(32 <= ord(c) < 127 for c in msg):
             return True, msg
@@ -50,17 +83,19 @@ def detect_hidden_message(image, key_params):
     except Exception as e:
         return False, f"Error: {e}"
 
+def show_stage_breakdown(stages):
+    # Per-request timing of each encode/decode stage
+    with st.expander("Stage timings"):
+        st.table(stages.breakdown())
+        if stages.counters:
+            st.json(dict(stages.counters))
+
 st.title("Image Steganography & Detection App")
 
 st.header("1. Upload an Image")
-uploaded_file = st.file_uploader("Choose an image...", type=["png", "jpg", "jpeg"])
+uploaded_file = st.file_uploader("Choose an image...", type=["png", "jpg", "jpeg", "bmp", "tif", "tiff"])
 
-delimiter_options = [
-    ('#', '#'), ('##', '##'), ('***', '***'), ('[START]', '[END]'),
-    ('<START>', '<END>'), ('<<START>>', '<<END>>'), ('<<', '>>'),
-    ('{', '}'), ('|', '|'), ('+++', '+++'), ('BEGIN', 'END'),
-    ('---', '---'), ('!!!', '!!!'), ('$$$', '$$$'), ('&&&', '&&&'), ('@@', '@@')
-]
+delimiter_options = input_generator.DELIMITER_OPTIONS
 
 if uploaded_file:
     image = Image.open(uploaded_file)
@@ -72,6 +107,12 @@ if uploaded_file:
     if action == "Hide a message in the image":
         st.header("Hide a Message in the Image")
         user_message = st.text_area("Enter the message you want to hide:")
+        format_col, level_col = st.columns(2)
+        with format_col:
+            download_format = st.selectbox("Output format (lossless)", list(DOWNLOAD_MIME_TYPES))
+        with level_col:
+            png_level = st.slider("PNG compression level", 0, 9, 6, disabled=download_format != 'PNG',
+                                  help="Lower levels save much faster at a slightly larger file size")
         if st.button("Generate Steganography Input & Encode"):
             if not user_message:
                 st.warning("Please enter a message to hide.")
@@ -80,20 +121,18 @@ if uploaded_file:
                 params = input_generator.generate_steganography_input(
                     rows=image.height, columns=image.width
                 )
-                # Generate a unique key for this encoding
-                key = str(uuid.uuid4())[:8]
-                
-                # Update parameters with message and key
-                params.update({
-                    'message': user_message,
-                    'key': key
-                })
+                params['message'] = user_message
                 
                 # Encode the image
-                stego_image = encode_image(image, user_message, params)
+                with collect() as stages:
+                    stego_image = encode_image(image, user_message, params)
+                show_stage_breakdown(stages)
                 if stego_image is None:
                     st.error("Encoding failed. Please try with a different message or image.")
                 else:
+                    # Register the parameters under a new key so it can be decoded in any later session
+                    key = get_registry().register(params, image=uploaded_file.name)
+                    params['key'] = key
                     st.image(stego_image, caption="Steganographed Image", use_container_width=True)
                     st.subheader("Your Secret Key:")
                     st.code(key, language="text")
@@ -101,21 +140,20 @@ if uploaded_file:
                     st.subheader("Parameters Used (for manual decoding):")
                     st.json(params)
                     # Download option
-                    buf = io.BytesIO()
-                    stego_image.save(buf, format="PNG")
-                    byte_im = buf.getvalue()
+                    byte_im = image_to_bytes(stego_image, download_format, png_level)
                     st.download_button(
                         label="Download Steganographed Image",
                         data=byte_im,
-                        file_name="steganographed.png",
-                        mime="image/png"
+                        file_name=f"steganographed{FORMAT_EXTENSIONS[download_format]}",
+                        mime=DOWNLOAD_MIME_TYPES[download_format]
                     )
                     # Store the last encoded image and parameters in session state
                     st.session_state['last_encoded_image'] = stego_image
+                    st.session_state['last_encoded_bytes'] = byte_im
                     st.session_state['last_params'] = params
     elif action == "Detect hidden message in the image":
         st.header("Detect Hidden Message")
-        image_to_check = image
+        image_bytes_to_check = uploaded_file.getvalue()
         
         # Initialize default parameters
         current_params = {
@@ -141,11 +179,13 @@ if uploaded_file:
             )
             
             if option == "Last Encoded Image":
-                image_to_check = st.session_state['last_encoded_image']
+                image_bytes_to_check = st.session_state['last_encoded_bytes']
                 if 'last_params' in st.session_state:
                     current_params = st.session_state['last_params'].copy()
                     st.info("Using parameters from last encoded image. You can modify them below if needed.")
         
+        digest, pixels = cached_pixels(image_bytes_to_check)
+        
         # Create two columns for key and manual input
         key_col, manual_col = st.columns(2)
         
@@ -163,13 +203,14 @@ if uploaded_file:
                     st.warning("Please enter a secret key")
                 else:
                     found = False
-                    # Only check last_params if we're looking at the last encoded image
-                    if option == "Last Encoded Image" and 'last_params' in st.session_state:
-                        if st.session_state['last_params'].get('key') == key:
-                            found, msg = detect_hidden_message(image_to_check, st.session_state['last_params'])
-                            if found:
-                                st.success("Message successfully decoded!")
-                                st.write(f"Hidden message: {msg}")
+                    key_params = get_registry().lookup(key)
+                    if key_params is not None:
+                        with collect() as stages:
+                            found, msg = detect_hidden_message(digest, pixels, key_params)
+                        show_stage_breakdown(stages)
+                        if found:
+                            st.success("Message successfully decoded!")
+                            st.write(f"Hidden message: {msg}")
                     
                     if not found:
                         st.error("Invalid key or no message found. Try manual parameters.")
@@ -205,7 +246,9 @@ if uploaded_file:
                         'horizontal': horizontal
                     }
                     
-                    found, msg = detect_hidden_message(image_to_check, manual_params)
+                    with collect() as stages:
+                        found, msg = detect_hidden_message(digest, pixels, manual_params)
+                    show_stage_breakdown(stages)
                     
                     if found:
                         st.success("Hidden message found!")
@@ -218,4 +261,46 @@ if uploaded_file:
                 except ValueError as ve:
                     st.error(f"Invalid input: Please check your parameters. {str(ve)}")
                 except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
\ No newline at end of file
+                    st.error(f"An error occurred: {str(e)}")
+
+        st.subheader("Is This Image Stego? (CNN)")
+        st.caption("Scores full-resolution 256x256 tiles with the trained detector and keeps the highest score.")
+        if st.button("Run CNN Detector"):
+            model = get_detector_model()
+            if model is None:
+                st.error(f"Model file {MODEL_PATH} not found. Train it with model_training.ipynb first.")
+            else:
+                try:
+                    with st.spinner("Scoring image tiles..."):
+                        # The detector takes RGB; grayscale, palette and RGBA uploads are converted first
+                        score, tile_scores = get_array_cache().get_or_create(
+                            ('cnn', digest, MODEL_PATH),
+                            lambda: stego_scanner.score_image(model, read_rgb(image_bytes_to_check)))
+                except Exception as e:
+                    st.error(f"Could not score this image: {str(e)}")
+                    st.stop()
+                if score >= 0.5:
+                    st.error(f"Likely stego: probability {score:.1%}")
+                else:
+                    st.success(f"Likely clean: probability of stego {score:.1%}")
+                st.caption(f"Highest of {len(tile_scores)} tile scores (mean {float(np.mean(tile_scores)):.1%})")
+
+        st.subheader("Search for Parameters Automatically")
+        st.caption("Tries every start position, gap, channel set, bit depth, direction and delimiter pair.")
+        if st.button("Run Blind Parameter Search"):
+            if blind_search.worker_peak_bytes(pixels.shape) > BLIND_SEARCH_MEMORY_BYTES:
+                st.error(f"Image too large for a blind search ({pixels.shape[1]}x{pixels.shape[0]}). "
+                         "Crop a copy to the region that may hold the message (resizing destroys the LSBs).")
+                st.stop()
+            with st.spinner("Searching the parameter space..."):
+                candidates = blind_search.blind_search(pixels, top_k=5, max_memory_bytes=BLIND_SEARCH_MEMORY_BYTES)
+            
+            if candidates and candidates[0]['score'] > 0:
+                best = candidates[0]
+                st.success("Likely hidden message found!")
+                st.write(f"Message: {best['message']}")
+                st.subheader("Best Candidates:")
+                for candidate in candidates:
+                    st.json({k: v for k, v in candidate.items() if k != 'message'})
+            else:
+                st.error("No likely message found in the searched parameter space.")
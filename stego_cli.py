@@ -0,0 +1,328 @@
+"""
+Command-line entry point: encode, decode, capacity and scan.
+
+    python stego_cli.py encode cover.png -o out.png -m "secret" --channels RG --num-bits 2
+    python stego_cli.py decode 'data/encoded_1x/*.png' --channels RG --num-bits 2 -j 4
+    cat out.png | python stego_cli.py decode - --channels RG --num-bits 2
+    python stego_cli.py capacity covers/ --gap 1
+    python stego_cli.py scan photos/ --method classical
+
+Only the standard library is imported up front; NumPy and PIL load when a
+command runs and TensorFlow only for CNN scans, so a decode starts about as
+fast as importing NumPy allows. Inputs may be files, directories, glob
+patterns or '-' for stdin; '-' as an output writes to stdout.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif', '.npy')
+
+
+def expand_inputs(patterns):
+    """Files for every argument: '-' as is, directories recursively, glob patterns expanded, in order"""
+    paths = []
+    for pattern in patterns:
+        if pattern == '-':
+            paths.append(pattern)
+        elif os.path.isdir(pattern):
+            for dirpath, dirnames, filenames in os.walk(pattern):
+                dirnames.sort()
+                paths.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                print(f"!!! Warning: No files match {pattern}", file=sys.stderr)
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def read_sources(paths):
+    """(label, source) pairs: paths stay paths, '-' becomes the bytes read from stdin (once)"""
+    if paths.count('-') > 1:
+        raise SystemExit("!!! Error: '-' (stdin) can only be given once.")
+    return [(path, sys.stdin.buffer.read() if path == '-' else path) for path in paths]
+
+
+def write_output(path, data):
+    if path == '-':
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def codec_params(args):
+    """encode_message/decode_message keyword arguments from the shared options"""
+    if args.registry_key:
+        from key_registry import get_registry
+        params = get_registry().lookup(args.registry_key)
+        if params is None:
+            raise SystemExit(f"!!! Error: Key {args.registry_key} is not registered.")
+        return {name: params[name] for name in ('start_position', 'gap', 'channels', 'num_bits',
+                                                'delimiter_start', 'delimiter_end', 'horizontal')}
+    return {
+        'start_position': tuple(args.start),
+        'gap': args.gap,
+        'channels': args.channels.upper(),
+        'num_bits': args.num_bits,
+        'delimiter_start': args.delimiters[0],
+        'delimiter_end': args.delimiters[1],
+        'horizontal': 0 if args.vertical else 1,
+        'framing': args.framing,
+        'key': args.key,
+    }
+
+
+def run_jobs(function, tasks, jobs):
+    """Results of function over tasks in input order, in a process pool when jobs > 1"""
+    if jobs <= 1 or len(tasks) <= 1:
+        return map(function, tasks)
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        return list(pool.map(function, tasks))
+    finally:
+        pool.shutdown()
+
+
+def output_path(source, args, single):
+    if args.output and single:
+        return args.output
+    stem = 'stdin' if source == '-' else os.path.splitext(os.path.basename(source))[0]
+    directory = args.out_dir or ('.' if source == '-' else os.path.dirname(source))
+    return os.path.join(directory, f"{stem}{args.suffix}.{args.format.lower()}")
+
+
+def _encode_one(task):
+    from encode_decode import encode_array
+    from image_io import image_to_bytes, probe_image
+
+    label, source, target, message, params, compression, compress_level, image_format = task
+    try:
+        if params is None:
+            # --random: parameters and message drawn like the dataset generator does
+            from input_generator import generate_steganography_input
+            generated = generate_steganography_input(*probe_image(source)[:2])
+            message = generated.pop('message')
+            params = {name: generated[name] for name in ('start_position', 'gap', 'channels', 'num_bits',
+                                                         'delimiter_start', 'delimiter_end', 'horizontal')}
+        img = encode_array(source, message, compression=compression, **params)
+        if img is None:
+            return label, target, None, ''
+        if target != '-':
+            image_format = os.path.splitext(target)[1][1:]
+        write_output(target, image_to_bytes(img, image_format, compress_level))
+        return label, target, {**params, 'message': message}, ''
+    except Exception as e:
+        return label, target, None, str(e)
+
+
+def cmd_encode(args):
+    paths = expand_inputs(args.inputs)
+    if len(paths) > 1 and args.output:
+        print("!!! Error: -o takes a single input, use --out-dir for several.", file=sys.stderr)
+        return 1
+    if '-' in paths and args.message_file == '-':
+        print("!!! Error: The image and the message cannot both come from stdin.", file=sys.stderr)
+        return 1
+
+    message = args.message
+    if args.message_file:
+        if args.message_file == '-':
+            message = sys.stdin.buffer.read()
+        else:
+            with open(args.message_file, 'rb') as f:
+                message = f.read()
+        if args.framing == 'delimiter':
+            message = message.decode('utf-8')
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    params = None if args.random else codec_params(args)
+    tasks = [(label, source, output_path(label, args, len(paths) == 1), message, params, args.compression,
+              args.png_level, args.format) for label, source in read_sources(paths)]
+    failed = 0
+    for label, target, used, error in run_jobs(_encode_one, tasks, args.jobs):
+        if used is None:
+            failed += 1
+            print(f"!!! Error: {label}: {error or 'encoding failed'}", file=sys.stderr)
+            continue
+        if args.random:
+            # The generated parameters are the only way to decode these images later
+            print(json.dumps({'path': label, 'output': target, **used}),
+                  file=sys.stderr if target == '-' else sys.stdout, flush=True)
+        elif target != '-':
+            print(f"{label} -> {target}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _decode_one(task):
+    from encode_decode import decode_array
+
+    label, source, params = task
+    try:
+        return label, decode_array(source, **params), ''
+    except Exception as e:
+        return label, None, str(e)
+
+
+def cmd_decode(args):
+    paths = expand_inputs(args.inputs)
+    params = codec_params(args)
+    failed = 0
+    tasks = [(label, source, params) for label, source in read_sources(paths)]
+    for source, message, error in run_jobs(_decode_one, tasks, args.jobs):
+        if error or message in (None, ''):
+            failed += 1
+            print(f"!!! Error: {source}: {error or 'no message found'}", file=sys.stderr)
+            if not args.json:
+                continue
+
+        if args.json:
+            value = message.hex() if isinstance(message, bytes) else message
+            print(json.dumps({'path': source, 'message': value, 'binary': isinstance(message, bytes),
+                              'error': error}), flush=True)
+        elif isinstance(message, bytes):
+            if len(paths) > 1:
+                print(f"{source}\t{message.hex()}", flush=True)
+            else:
+                write_output(args.output, message)
+        elif len(paths) > 1:
+            print(f"{source}\t{message}", flush=True)
+        else:
+            write_output(args.output, message.encode('utf-8') + (b'\n' if args.output == '-' else b''))
+    return 1 if failed else 0
+
+
+def _capacity_one(task):
+    from encode_decode import capacity_bits, message_capacity
+    from image_io import probe_image
+
+    label, source, params = task
+    try:
+        rows, cols = probe_image(source)[:2]
+        start_row, start_col = params['start_position']
+        if not (0 <= start_row < rows and 0 <= start_col < cols):
+            return label, rows, cols, None, None, 'start position outside the image'
+        bits_per_pixel = len(params['channels']) * params['num_bits']
+        pixels = capacity_bits(rows, cols, params['start_position'], params['gap'], params['channels'],
+                               params['num_bits'], params['horizontal']) // bits_per_pixel
+        capacity = message_capacity(rows, cols, params['start_position'], params['gap'], params['channels'],
+                                    params['num_bits'], params['delimiter_start'], params['delimiter_end'],
+                                    params['horizontal'], params.get('framing', 'delimiter'))
+        return label, rows, cols, pixels, capacity, ''
+    except Exception as e:
+        return label, None, None, None, None, str(e)
+
+
+def cmd_capacity(args):
+    paths = expand_inputs(args.inputs)
+    params = codec_params(args)
+    unit = 'bytes' if params.get('framing') == 'binary' else 'characters'
+    failed = 0
+    tasks = [(label, source, params) for label, source in read_sources(paths)]
+    for source, rows, cols, pixels, capacity, error in run_jobs(_capacity_one, tasks, args.jobs):
+        if error:
+            failed += 1
+            print(f"!!! Error: {source}: {error}", file=sys.stderr)
+        elif args.json:
+            print(json.dumps({'path': source, 'width': cols, 'height': rows, 'pixels': pixels,
+                              'capacity': capacity, 'unit': unit}))
+        else:
+            print(f"{source}\t{cols}x{rows}\t{capacity} {unit}")
+    return 1 if failed else 0
+
+
+def cmd_scan(args):
+    paths = [p for p in expand_inputs(args.inputs) if p != '-']
+    if args.method == 'cnn':
+        from stego_scanner import load_model, scan_images
+        results = scan_images(load_model(args.model), paths, threads=max(1, args.jobs), threshold=args.threshold)
+    else:
+        from classical_steganalysis import tiered_detect
+        model = None
+        if args.method == 'tiered':
+            from stego_scanner import load_model
+            model = load_model(args.model)
+        results = tiered_detect(paths, model, threshold=args.threshold)
+
+    flagged = 0
+    for result in results:
+        flagged += result['verdict'] == 'stego'
+        print(json.dumps(result), flush=True)
+    print(f"{flagged} of {len(paths)} images flagged as stego", file=sys.stderr)
+    return 0
+
+
+def add_codec_options(sub):
+    sub.add_argument("--start", type=int, nargs=2, default=(0, 0), metavar=("ROW", "COL"))
+    sub.add_argument("--gap", type=int, default=0, help="Pixels skipped between used pixels")
+    sub.add_argument("--channels", default='RGB', help="Channels used, e.g. R, GB, RGB")
+    sub.add_argument("--num-bits", type=int, default=1, help="LSBs used per channel (1-8)")
+    sub.add_argument("--delimiters", nargs=2, default=('#', '#'), metavar=("START", "END"))
+    sub.add_argument("--vertical", action='store_true', help="Column-wise traversal")
+    sub.add_argument("--framing", choices=['delimiter', 'binary'], default='delimiter')
+    sub.add_argument("--key", default=None, help="Keyed traversal secret")
+    sub.add_argument("--registry-key", default=None, help="Take every parameter from the key registry")
+    sub.add_argument("-j", "--jobs", type=int, default=1, help="Files processed concurrently")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="LSB steganography from the command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encode_parser = commands.add_parser("encode", help="Hide a message in one or more images")
+    encode_parser.add_argument("inputs", nargs='+', help="Cover images, directories, globs or '-' for stdin")
+    message_group = encode_parser.add_mutually_exclusive_group(required=True)
+    message_group.add_argument("-m", "--message")
+    message_group.add_argument("--message-file", help="Read the message from a file ('-' for stdin)")
+    message_group.add_argument("--random", action='store_true',
+                               help="Random parameters and message per image, printed as JSON lines")
+    encode_parser.add_argument("-o", "--output", default=None, help="Output image for a single input ('-' for stdout)")
+    encode_parser.add_argument("--out-dir", default=None, help="Output directory for several inputs")
+    encode_parser.add_argument("--suffix", default='_stego', help="Appended to output names in --out-dir")
+    encode_parser.add_argument("--format", choices=['PNG', 'BMP', 'TIFF', 'NPY'], default='PNG', type=str.upper)
+    encode_parser.add_argument("--png-level", type=int, default=None, help="PNG compression level 0-9")
+    encode_parser.add_argument("--compression", choices=['zlib', 'lzma'], default=None,
+                               help="Compress the message (binary framing)")
+    add_codec_options(encode_parser)
+    encode_parser.set_defaults(func=cmd_encode)
+
+    decode_parser = commands.add_parser("decode", help="Recover messages from one or more images")
+    decode_parser.add_argument("inputs", nargs='+', help="Stego images, directories, globs or '-' for stdin")
+    decode_parser.add_argument("-o", "--output", default='-', help="Message output for a single input")
+    decode_parser.add_argument("--json", action='store_true', help="One JSON line per image")
+    add_codec_options(decode_parser)
+    decode_parser.set_defaults(func=cmd_decode)
+
+    capacity_parser = commands.add_parser("capacity", help="Largest message each image can hold")
+    capacity_parser.add_argument("inputs", nargs='+', help="Images, directories, globs or '-' for stdin")
+    capacity_parser.add_argument("--json", action='store_true', help="One JSON line per image")
+    add_codec_options(capacity_parser)
+    capacity_parser.set_defaults(func=cmd_capacity)
+
+    scan_parser = commands.add_parser("scan", help="Detect LSB steganography")
+    scan_parser.add_argument("inputs", nargs='+', help="Images, directories or globs")
+    scan_parser.add_argument("--method", choices=['cnn', 'classical', 'tiered'], default='cnn',
+                             help="CNN detector, classical statistics only, or classical first then CNN")
+    scan_parser.add_argument("--model", default="steganography_detector_model.keras", help="Trained Keras model")
+    scan_parser.add_argument("--threshold", type=float, default=0.5, help="CNN score at or above which an image is stego")
+    scan_parser.add_argument("-j", "--jobs", type=int, default=8, help="Image decoding threads (cnn)")
+    scan_parser.set_defaults(func=cmd_scan)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif')
+TILE_SIZE = 256
+MODEL_PATH = "steganography_detector_model.keras"
+
+RESULT_FIELDS = ['path', 'verdict', 'score', 'max_tile_score', 'mean_tile_score', 'tiles', 'width', 'height', 'error']
+
+
+def iter_image_files(root, extensions=IMAGE_EXTENSIONS):
+    """Every image file under root (or root itself if it is a file), in sorted order"""
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(extensions):
+                yield os.path.join(dirpath, name)
+
+
+def tile_image(pixels, tile_size=TILE_SIZE, max_tiles=None):
+    """
+    Cut a full-resolution RGB array into non-overlapping tile_size x tile_size
+    tiles, without resizing so the LSBs survive. Border tiles that do not
+    fill a whole tile are padded by edge replication. With max_tiles the
+    tiles are subsampled evenly over the image.
+    """
+    rows, cols = pixels.shape[:2]
+    pad_rows = -rows % tile_size
+    pad_cols = -cols % tile_size
+    if pad_rows or pad_cols:
+        pixels = np.pad(pixels, ((0, pad_rows), (0, pad_cols), (0, 0)), mode='edge')
+
+    grid_rows, grid_cols = pixels.shape[0] // tile_size, pixels.shape[1] // tile_size
+    tiles = (pixels.reshape(grid_rows, tile_size, grid_cols, tile_size, 3)
+             .swapaxes(1, 2)
+             .reshape(-1, tile_size, tile_size, 3))
+
+    if max_tiles is not None and len(tiles) > max_tiles:
+        tiles = tiles[np.linspace(0, len(tiles) - 1, max_tiles).astype(int)]
+    return tiles
+
+
+def load_rgb(path):
+    """Decode an image file to an RGB uint8 array"""
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def combine_scores(tile_scores, aggregate='max'):
+    """One image score from its tile scores: 'max' flags an image if any tile looks stego, 'mean' averages"""
+    if aggregate == 'mean':
+        return float(np.mean(tile_scores))
+    return float(np.max(tile_scores))
+
+
+def predict_tiles(model, tiles):
+    """Stego probability per uint8 tile"""
+    return np.asarray(model.predict_on_batch(tiles.astype(np.float32) / 255.0)).reshape(-1)
+
+
+def score_image(model, pixels, tile_size=TILE_SIZE, aggregate='max', max_tiles=None, batch_size=64):
+    """Score a single in-memory image with tiled inference, returns (score, tile scores)"""
+    tiles = tile_image(np.asarray(pixels)[..., :3], tile_size, max_tiles)
+    scores = np.concatenate([predict_tiles(model, tiles[i:i + batch_size]) for i in range(0, len(tiles), batch_size)])
+    return combine_scores(scores, aggregate), scores
+
+
+def scan_images(model, paths, batch_size=64, threads=8, tile_size=TILE_SIZE, threshold=0.5,
+                aggregate='max', max_tiles=None, max_pending=None):
+    """
+    Yield one result dict per image, in completion order.
+
+    Images are decoded in a thread pool and at most max_pending decoded
+    images are waiting at any time. Their tiles are pooled across images into
+    predict calls of batch_size tiles. An image's result is emitted as soon
+    as all of its tiles are scored, so memory stays bounded however many
+    images are scanned.
+    """
+    max_pending = 2 * threads if max_pending is None else max_pending
+    paths = iter(paths)
+
+    tile_buffer, owner_buffer = [], []
+    open_images = {}
+
+    def finish(entry):
+        scores = np.asarray(entry['scores'])
+        score = combine_scores(scores, aggregate)
+        return {
+            'path': entry['path'],
+            'verdict': 'stego' if score >= threshold else 'clean',
+            'score': round(score, 6),
+            'max_tile_score': round(float(scores.max()), 6),
+            'mean_tile_score': round(float(scores.mean()), 6),
+            'tiles': len(scores),
+            'width': entry['width'],
+            'height': entry['height'],
+            'error': '',
+        }
+
+    def run_batch(count):
+        tiles = np.stack(tile_buffer[:count])
+        owners = owner_buffer[:count]
+        del tile_buffer[:count], owner_buffer[:count]
+        for owner, score in zip(owners, predict_tiles(model, tiles)):
+            entry = open_images[owner]
+            entry['scores'].append(float(score))
+            if len(entry['scores']) == entry['tile_count']:
+                yield finish(open_images.pop(owner))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(load_rgb, path)))
+            if len(pending) >= max_pending:
+                break
+
+        image_id = 0
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(load_rgb, next_path)))
+
+            try:
+                pixels = future.result()
+            except Exception as e:
+                yield {**{field: '' for field in RESULT_FIELDS}, 'path': path, 'verdict': 'error', 'error': str(e)}
+                continue
+
+            tiles = tile_image(pixels, tile_size, max_tiles)
+            open_images[image_id] = {'path': path, 'scores': [], 'tile_count': len(tiles),
+                                     'height': pixels.shape[0], 'width': pixels.shape[1]}
+            tile_buffer.extend(tiles)
+            owner_buffer.extend([image_id] * len(tiles))
+            image_id += 1
+
+            while len(tile_buffer) >= batch_size:
+                yield from run_batch(batch_size)
+
+    if tile_buffer:
+        yield from run_batch(len(tile_buffer))
+
+
+class ResultWriter:
+    """Streams scan results to CSV or JSONL, one flushed line per image"""
+
+    def __init__(self, path, output_format=None):
+        self.format = output_format or ('csv' if str(path).lower().endswith('.csv') else 'jsonl')
+        self.file = sys.stdout if path in (None, '-') else open(path, 'w', newline='', encoding='utf-8')
+        self.writer = None
+        if self.format == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, result):
+        if self.writer is not None:
+            self.writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def load_model(model_path=MODEL_PATH):
+    """Load the trained Keras detector (TensorFlow is imported only here)"""
+    import tensorflow as tf
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a directory tree for LSB steganography with the CNN detector")
+    parser.add_argument("root", help="Image file or directory to scan")
+    parser.add_argument("--model", default=MODEL_PATH, help="Trained Keras model")
+    parser.add_argument("--output", default="-", help="Result file (.csv or .jsonl), '-' for stdout")
+    parser.add_argument("--format", choices=['csv', 'jsonl'], default=None, help="Override the output format")
+    parser.add_argument("--batch-size", type=int, default=64, help="Tiles per predict call")
+    parser.add_argument("--threads", type=int, default=8, help="Image decoding threads")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="Tile edge in pixels (model input size)")
+    parser.add_argument("--max-tiles", type=int, default=None, help="Cap on tiles scored per image")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Score at or above which an image is stego")
+    parser.add_argument("--aggregate", choices=['max', 'mean'], default='max', help="How tile scores are combined")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    writer = ResultWriter(args.output, args.format)
+    start = time.perf_counter()
+    count = flagged = 0
+    try:
+        for result in scan_images(model, iter_image_files(args.root), args.batch_size, args.threads,
+                                  args.tile_size, args.threshold, args.aggregate, args.max_tiles):
+            writer.write(result)
+            count += 1
+            flagged += result['verdict'] == 'stego'
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scanned {count} images in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f} images/sec), "
+          f"{flagged} flagged as stego", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
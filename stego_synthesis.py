@@ -0,0 +1,178 @@
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+from encode_decode import encode_array
+from image_io import read_rgb
+from input_generator import generate_steganography_input
+from message_generator import get_message_pool
+from training_data import CONFIG, scale_batch
+
+_worker_covers = None
+
+
+def load_covers(cover_paths, image_size=CONFIG['IMAGE_SIZE']):
+    """Decode every cover once into one uint8 array of shape (N, rows, cols, 3), resized as in training"""
+    rows, cols = image_size
+    covers = np.empty((len(cover_paths), rows, cols, 3), dtype=np.uint8)
+    for i, path in enumerate(cover_paths):
+        covers[i] = read_rgb(path, image_size)
+    return covers
+
+
+def _init_worker(covers):
+    global _worker_covers
+    _worker_covers = covers
+
+
+def synthesize_batch(cover_indices, seed=None, covers=None):
+    """
+    Build one balanced batch from clean covers: every cover appears once as
+    is (label 0) and once with a message embedded using fresh
+    generate_steganography_input parameters (label 1).
+
+    Returns (uint8 images, float32 labels, seconds spent).
+    """
+    start = time.perf_counter()
+    covers = _worker_covers if covers is None else covers
+    rng = random.Random(seed)  # local, so in-process synthesis leaves the caller's random state alone
+
+    rows, cols = covers.shape[1:3]
+    images = np.empty((2 * len(cover_indices), rows, cols, 3), dtype=np.uint8)
+    labels = np.zeros(2 * len(cover_indices), dtype=np.float32)
+
+    for i, idx in enumerate(cover_indices):
+        cover = covers[idx]
+        params = generate_steganography_input(rows=rows, columns=cols, rng=rng)
+        stego = encode_array(cover, params['message'], params['start_position'], params['gap'],
+                             params['channels'], params['num_bits'], params['delimiter_start'],
+                             params['delimiter_end'], params['horizontal'])
+        images[2 * i] = cover
+        images[2 * i + 1] = cover if stego is None else stego
+        labels[2 * i + 1] = 0.0 if stego is None else 1.0
+
+    return images, labels, time.perf_counter() - start
+
+
+class SynthesisStats:
+    """Worker-side generation time per batch, shared with SynthesisBudgetCallback"""
+
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self.batch_seconds = []
+
+    def record(self, seconds):
+        self.batch_seconds.append(seconds)
+
+    def effective_batch_seconds(self):
+        """Average wall time per batch once the work is spread over the workers"""
+        if not self.batch_seconds:
+            return 0.0
+        return float(np.mean(self.batch_seconds)) / self.workers
+
+    def reset(self):
+        self.batch_seconds = []
+
+
+def synthetic_batches(covers, batch_size=CONFIG['BATCH_SIZE'], workers=None, prefetch=None, seed=None, stats=None):
+    """
+    Endless generator of freshly synthesized (uint8 images, labels) batches.
+
+    batch_size/2 covers are drawn per batch (with replacement when there
+    are fewer covers than that) and embedded in worker processes; up to
+    `prefetch` batches are in flight so generation overlaps with training.
+    Nothing is written to disk.
+    """
+    if len(covers) == 0:
+        raise ValueError("synthetic_batches needs at least one cover")
+    workers = os.cpu_count() if workers is None else workers
+    prefetch = 2 * max(1, workers) if prefetch is None else prefetch
+    rng = np.random.default_rng(seed)
+    covers_per_batch = max(1, batch_size // 2)
+    replace = len(covers) < covers_per_batch
+
+    def next_task():
+        return rng.choice(len(covers), covers_per_batch, replace=replace), int(rng.integers(2**31))
+
+    if workers <= 1:
+        while True:
+            images, labels, seconds = synthesize_batch(*next_task(), covers=covers)
+            if stats is not None:
+                stats.record(seconds)
+            yield images, labels
+
+    # Forked workers inherit the message corpus and the covers instead of receiving copies per task
+    get_message_pool()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(covers,)) as pool:
+        pending = deque(pool.submit(synthesize_batch, *next_task()) for _ in range(prefetch))
+        while True:
+            images, labels, seconds = pending.popleft().result()
+            pending.append(pool.submit(synthesize_batch, *next_task()))
+            if stats is not None:
+                stats.record(seconds)
+            yield images, labels
+
+
+def make_synthetic_dataset(covers, batch_size=CONFIG['BATCH_SIZE'], workers=None, prefetch=None,
+                           seed=None, stats=None):
+    """tf.data wrapper around synthetic_batches yielding float batches in [0, 1]"""
+    rows, cols = covers.shape[1:3]
+    batch = 2 * max(1, batch_size // 2)
+    ds = tf.data.Dataset.from_generator(
+        lambda: synthetic_batches(covers, batch_size, workers, prefetch, seed, stats),
+        output_signature=(tf.TensorSpec((batch, rows, cols, 3), tf.uint8),
+                          tf.TensorSpec((batch,), tf.float32)))
+    ds = ds.map(lambda images, labels: (scale_batch(images), labels), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+class SynthesisBudgetCallback(tf.keras.callbacks.Callback):
+    """
+    Compares synthesis cost with model step time every epoch and warns when
+    generation, not the model, is the bottleneck.
+    """
+
+    def __init__(self, stats, verbose=True):
+        super().__init__()
+        self.stats = stats
+        self.verbose = verbose
+        self.step_seconds = []
+        self.history = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.step_seconds = []
+        self.stats.reset()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step_seconds.append(time.perf_counter() - self._step_start)
+
+    def on_epoch_end(self, epoch, logs=None):
+        step = float(np.median(self.step_seconds)) if self.step_seconds else 0.0
+        generation = self.stats.effective_batch_seconds()
+        self.history.append({'epoch': epoch + 1, 'step_seconds': step, 'generation_seconds': generation})
+
+        if self.verbose:
+            print(f"\nSynthesis: {generation*1000:.1f} ms/batch over {self.stats.workers} workers, "
+                  f"model step: {step*1000:.1f} ms")
+            if generation > step:
+                print("!!! Stego synthesis is slower than the model step, add workers or lower the batch size.")
+
+
+if __name__ == "__main__":
+    from training_data import CLEAN_IMAGES_DIR
+
+    paths = sorted(CLEAN_IMAGES_DIR.rglob("*.jpg")) + sorted(CLEAN_IMAGES_DIR.rglob("*.png"))
+    covers = load_covers(paths)
+    stats = SynthesisStats(os.cpu_count())
+    batches = synthetic_batches(covers, stats=stats)
+    for _ in range(20):
+        next(batches)
+    print(f"{stats.effective_batch_seconds()*1000:.1f} ms per batch of {CONFIG['BATCH_SIZE']}")
@@ -0,0 +1,149 @@
+import os
+import shutil
+
+import numpy as np
+
+from encode_decode import (build_payload_bits, check_parameters, check_start_position,
+                           decode_bit_stream, decode_frame_stream, embed_bits, extract_bits,
+                           traversal_pixel_count)
+
+# Upper bound on the pixel data held in memory at once
+DEFAULT_STRIP_BYTES = 64 * 1024 * 1024
+
+
+def open_image_memmap(path, mode='r', shape=None):
+    """
+    Memory-map a cover stored as .npy or as raw interleaved uint8 pixels.
+
+    Raw files need shape=(rows, cols, channels). Nothing is read until
+    pixels are accessed, so opening a gigapixel scan costs no memory.
+    """
+    if path.lower().endswith('.npy'):
+        return np.load(path, mmap_mode=mode)
+    if shape is None:
+        raise ValueError(f"Raw image {path} needs shape=(rows, cols, channels)")
+    return np.memmap(path, dtype=np.uint8, mode=mode, shape=tuple(shape))
+
+
+def save_image_npy(img, npy_path):
+    """Store a pixel array as .npy so it can be memory-mapped by the streaming functions"""
+    out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.uint8, shape=img.shape)
+    out[:] = img
+    out.flush()
+    del out
+
+
+def load_traversal_strip(img, first_index, n_pixels, gap, start_position, horizontal):
+    """
+    Copy into memory the row strip (horizontal) or column strip (vertical)
+    holding traversal pixels first_index .. first_index + n_pixels - 1.
+
+    Returns (strip, flat indices of those pixels inside the strip, region),
+    where region indexes the strip in the full image.
+    """
+    rows, cols = img.shape[:2]
+    r_start, c_start = start_position
+    offsets = np.arange(first_index, first_index + n_pixels, dtype=np.int64) * (gap + 1)
+
+    if horizontal:
+        positions = r_start * cols + c_start + offsets
+        first_row, last_row = positions[0] // cols, positions[-1] // cols
+        region = (slice(first_row, last_row + 1), slice(None))
+        local = positions - first_row * cols
+    else:
+        positions = c_start * rows + r_start + offsets
+        first_col, last_col = positions[0] // rows, positions[-1] // rows
+        region = (slice(None), slice(first_col, last_col + 1))
+        local = (positions % rows) * (last_col - first_col + 1) + positions // rows - first_col
+
+    return np.array(img[region]), local, region
+
+
+def _chunk_pixels(img, gap, horizontal, strip_bytes):
+    """Traversal pixels per chunk so one strip stays within strip_bytes"""
+    rows, cols, channels = img.shape
+    line_bytes = (cols if horizontal else rows) * channels
+    budget = max(strip_bytes - line_bytes, line_bytes)
+    return max(1, budget // ((gap + 1) * channels))
+
+
+def encode_message_streaming(img_path, out_path, message, start_position=(0, 0), gap=0,
+                             channels='RGB', num_bits=1, delimiter_start='#', delimiter_end='#',
+                             horizontal=1, shape=None, strip_bytes=DEFAULT_STRIP_BYTES,
+                             framing='delimiter', compression=None):
+    """
+    encode_message for covers too large to load: img_path is a .npy or raw
+    file (raw needs shape). The cover is copied to out_path (None = encode
+    in place) and only the strips the traversal crosses are read and
+    rewritten, at most strip_bytes at a time. Returns True on success.
+    """
+    if not check_parameters(channels, num_bits, horizontal):
+        return False
+
+    img = open_image_memmap(img_path, 'r', shape)
+    rows, cols, _ = img.shape
+    channels = channels.upper()
+
+    if not check_start_position(start_position, rows, cols):
+        return False
+
+    binary_message = build_payload_bits(message, rows, cols, start_position, gap, channels, num_bits,
+                                        delimiter_start, delimiter_end, horizontal, framing, compression)
+    if binary_message is None:
+        return False
+    del img
+
+    if out_path is not None and os.path.abspath(out_path) != os.path.abspath(img_path):
+        shutil.copyfile(img_path, out_path)
+    else:
+        out_path = img_path
+
+    out = open_image_memmap(out_path, 'r+', shape)
+    bits_per_pixel = len(channels) * num_bits
+    pixel_count = len(binary_message) // bits_per_pixel
+    chunk = _chunk_pixels(out, gap, horizontal, strip_bytes)
+
+    for first_index in range(0, pixel_count, chunk):
+        n_pixels = min(chunk, pixel_count - first_index)
+        strip, local, region = load_traversal_strip(out, first_index, n_pixels, gap, start_position, horizontal)
+        bits = binary_message[first_index * bits_per_pixel:(first_index + n_pixels) * bits_per_pixel]
+        embed_bits(strip, bits, local, channels, num_bits)
+        out[region] = strip
+
+    out.flush()
+    del out
+    return True
+
+
+def decode_message_streaming(img_path, start_position=(0, 0), gap=0,
+                             channels='RGB', num_bits=1, delimiter_start='#', delimiter_end='#',
+                             horizontal=1, shape=None, strip_bytes=DEFAULT_STRIP_BYTES,
+                             framing='delimiter'):
+    """
+    decode_message for memory-mapped .npy or raw covers. Reads strip by
+    strip and stops at the end delimiter like decode_message.
+    """
+    if not check_parameters(channels, num_bits, horizontal):
+        return ""
+
+    img = open_image_memmap(img_path, 'r', shape)
+    rows, cols, _ = img.shape
+    channels = channels.upper()
+
+    if not check_start_position(start_position, rows, cols):
+        return ""
+
+    pixel_count = traversal_pixel_count(rows, cols, start_position, gap, horizontal)
+    chunk = _chunk_pixels(img, gap, horizontal, strip_bytes)
+
+    def read_bits(first_index, n_pixels):
+        parts = []
+        for first in range(first_index, first_index + n_pixels, chunk):
+            n = min(chunk, first_index + n_pixels - first)
+            strip, local, _ = load_traversal_strip(img, first, n, gap, start_position, horizontal)
+            parts.append(extract_bits(strip, local, channels, num_bits))
+        return np.concatenate(parts)
+
+    if framing == 'binary':
+        return decode_frame_stream(read_bits, pixel_count, len(channels) * num_bits)
+    return decode_bit_stream(read_bits, pixel_count, delimiter_start, delimiter_end)
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+from sklearn.datasets import load_sample_image
+
+from classical_steganalysis import classical_scores, classical_verdict
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def clean_covers():
+    covers = {'man.jpg': np.asarray(Image.open(os.path.join(REPO_DIR, 'images', 'man.jpg')).convert('RGB'))}
+    for name in ('china.jpg', 'flower.jpg'):
+        image = load_sample_image(name)
+        covers[name] = image
+        covers[f'{name} crop'] = image[100:356, 200:456]
+    return covers
+
+
+@pytest.mark.parametrize('name', list(clean_covers()))
+def test_clean_photo_is_not_called_stego(name):
+    # Chi-square scores these clean photos close to 1; the tier must not decide 'stego' on it
+    assert classical_verdict(classical_scores(clean_covers()[name])) != 'stego'
+
+
+def test_dense_lsb_replacement_is_called_stego():
+    image = load_sample_image('china.jpg').copy()
+    flat = image.reshape(-1)
+    embedded = int(flat.size * 0.6)
+    flat[:embedded] = (flat[:embedded] & 0xFE) | np.random.default_rng(0).integers(0, 2, embedded, dtype=np.uint8)
+    assert classical_verdict(classical_scores(image)) == 'stego'
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from encode_decode import decode_array, encode_array, message_capacity
+
+
+# Reference: the original per-pixel decoder, on an array instead of a file
+def baseline_position(pixel_index, gap, start_row, start_col, rows, cols, horizontal):
+    offset = pixel_index * (gap + 1)
+    if horizontal:
+        total = start_row * cols + start_col + offset
+        return total // cols, total % cols
+    total = start_col * rows + start_row + offset
+    return total % rows, total // rows
+
+
+def baseline_decode(img, start_position=(0, 0), gap=0, channels='RGB', num_bits=1,
+                    delimiter_start='#', delimiter_end='#', horizontal=1):
+    rows, cols, _ = img.shape
+    r_start, c_start = start_position
+    bits = ''
+    pixel_index = 0
+    while True:
+        row, col = baseline_position(pixel_index, gap, r_start, c_start, rows, cols, horizontal)
+        if row >= rows or col >= cols:
+            break
+        for channel in channels:
+            bits += format(img[row, col]['RGB'.index(channel)] & ((1 << num_bits) - 1), f'0{num_bits}b')
+        pixel_index += 1
+
+    message = ''.join(chr(int(bits[i:i + 8], 2)) for i in range(0, len(bits) - 7, 8))
+    if delimiter_start and message.startswith(delimiter_start):
+        message = message[len(delimiter_start):]
+    if delimiter_end and delimiter_end in message:
+        message = message[:message.find(delimiter_end)]
+    return message
+
+
+# Reference: the original per-pixel encoder, on an array instead of a file
+def baseline_encode(img, message, start_position=(0, 0), gap=0, channels='RGB', num_bits=1,
+                    delimiter_start='#', delimiter_end='#', horizontal=1):
+    img = img.copy()
+    rows, cols, _ = img.shape
+    r_start, c_start = start_position
+    bits = ''.join(format(ord(c), '08b') for c in delimiter_start + message + delimiter_end)
+    bits_per_pixel = len(channels) * num_bits
+    total_pixels = (cols - c_start) + (rows - r_start - 1) * cols if horizontal else \
+        (rows - r_start) + (cols - c_start - 1) * rows
+    padded = -(-len(bits) // bits_per_pixel) * bits_per_pixel
+    if padded > total_pixels // (gap + 1) * bits_per_pixel:
+        return None
+    bits = bits.ljust(padded, '0')
+
+    for pixel_index in range(padded // bits_per_pixel):
+        row, col = baseline_position(pixel_index, gap, r_start, c_start, rows, cols, horizontal)
+        chunk = bits[pixel_index * bits_per_pixel:(pixel_index + 1) * bits_per_pixel]
+        for i, channel in enumerate(channels):
+            channel_idx = 'RGB'.index(channel)
+            value = int(img[row, col, channel_idx]) & (0xFF ^ ((1 << num_bits) - 1))
+            img[row, col, channel_idx] = value | int(chunk[i * num_bits:(i + 1) * num_bits], 2)
+    return img
+
+
+def test_short_stream_still_cut_at_end_delimiter():
+    img = np.zeros((2, 2, 3), dtype=np.uint8)
+    img.reshape(-1)[:12] = np.frombuffer(b'ab>>cdefghij', dtype=np.uint8)
+    params = dict(num_bits=8, delimiter_start='<<START>>' * 2, delimiter_end='>>')
+    assert baseline_decode(img, **params) == 'ab'
+    assert decode_array(img, **params) == 'ab'
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_decode_matches_baseline_on_short_streams(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = rng.integers(1, 9, size=2)
+    # Few distinct byte values so delimiters actually occur in the stream
+    img = rng.choice(np.frombuffer(b'#<>ab', dtype=np.uint8), size=(rows, cols, 3))
+    params = dict(start_position=(int(rng.integers(rows)), int(rng.integers(cols))), gap=int(rng.integers(3)),
+                  channels=str(rng.choice(['R', 'GB', 'RGB'])), num_bits=8,
+                  delimiter_start=str(rng.choice(['', '#', '<<', '<<START>><<START>>'])),
+                  delimiter_end=str(rng.choice(['', '#', '>>', 'a>'])), horizontal=int(rng.integers(2)))
+    assert decode_array(img, **params) == baseline_decode(img, **params)
+
+
+@pytest.mark.parametrize('params', [
+    dict(gap=2, channels='RGB', num_bits=8),
+    dict(gap=0, channels='R', num_bits=3, start_position=(4, 7), horizontal=0),
+    dict(gap=3, channels='GB', num_bits=1, delimiter_start='<<', delimiter_end='>>>'),
+    dict(gap=1, channels='RGB', num_bits=5, framing='binary'),
+])
+def test_message_capacity_is_the_encoder_limit(params):
+    img = np.random.default_rng(0).integers(0, 256, size=(10, 10, 3), dtype=np.uint8)
+    capacity = message_capacity(10, 10, **params)
+    assert encode_array(img, 'x' * capacity, **params) is not None
+    assert encode_array(img, 'x' * (capacity + 1), **params) is None
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_encode_matches_baseline(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = (int(v) for v in rng.integers(4, 24, size=2))
+    img = rng.integers(0, 256, size=(rows, cols, 3), dtype=np.uint8)
+    params = dict(start_position=(int(rng.integers(rows // 2)), int(rng.integers(cols // 2))), gap=int(rng.integers(3)),
+                  channels=str(rng.choice(['R', 'GB', 'RGB', 'BR'])), num_bits=int(rng.integers(1, 9)),
+                  delimiter_start=str(rng.choice(['', '#', '<<START>>'])),
+                  delimiter_end=str(rng.choice(['', '#', '<<END>>'])), horizontal=int(rng.integers(2)))
+    message = ''.join(chr(c) for c in rng.integers(32, 256, size=int(rng.integers(0, 60))))
+
+    expected = baseline_encode(img, message, **params)
+    encoded = encode_array(img, message, **params)
+    if expected is None:
+        assert encoded is None
+    else:
+        assert np.array_equal(encoded, expected)
+        assert decode_array(encoded, **params) == baseline_decode(expected, **params)
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib', 'lzma'])
+@pytest.mark.parametrize('message', ['', 'short', 'unicode ☃ text ' * 40, bytes(range(256)) * 3])
+def test_binary_frame_round_trip(message, compression):
+    img = np.random.default_rng(1).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    params = dict(start_position=(3, 5), gap=1, channels='RGB', num_bits=2, framing='binary', key='frame')
+    encoded = encode_array(img, message, compression=compression, **params)
+    assert encoded is not None
+    decoded = decode_array(encoded, **params)
+    assert type(decoded) is type(message) and decoded == message
+
+
+def test_unframed_image_decodes_to_empty():
+    img = np.zeros((16, 16, 3), dtype=np.uint8)
+    assert decode_array(img, framing='binary') == ""
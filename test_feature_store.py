@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from feature_store import FeatureStore, build_feature_store
+
+
+def write_images(directory, count, seed):
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        Image.fromarray(rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)).save(os.path.join(directory, f'{i}.png'))
+
+
+def test_rebuild_only_when_a_source_file_changes(tmp_path):
+    clean, encoded, store = str(tmp_path / 'clean'), str(tmp_path / 'encoded'), str(tmp_path / 'store')
+    write_images(clean, 6, seed=0)
+    write_images(encoded, 6, seed=1)
+    options = dict(sources=((clean, 0), (encoded, 1)), image_size=(8, 8), num_shards=4, workers=1)
+
+    first = build_feature_store(store, **options)
+    assert first['images'] == 12 and first['rebuilt'] == first['shards']
+
+    assert build_feature_store(store, **options)['rebuilt'] == 0
+
+    # A new modification time with the same content does not rebuild anything
+    touched = os.path.join(clean, '0.png')
+    os.utime(touched, ns=(os.stat(touched).st_atime_ns, os.stat(touched).st_mtime_ns + 10**9))
+    assert build_feature_store(store, **options)['rebuilt'] == 0
+
+    # Changed content rebuilds only the shard holding that file
+    Image.fromarray(np.full((8, 8, 3), 7, dtype=np.uint8)).save(touched)
+    summary = build_feature_store(store, **options)
+    assert summary['rebuilt'] == 1 and summary['reused'] == summary['shards'] - 1
+
+    features = FeatureStore(store)
+    assert len(features) == 12
+    index = features.paths.index(touched)
+    rgb = np.concatenate([features.shard_arrays(i, ('rgb',))[0]['rgb'] for i in range(len(features.shards))])
+    assert (rgb[index] == 7).all()
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_io import read_rgb
+from test_training_data import smooth_image
+from training_data import decode_and_resize
+
+MODES = [('rgb.png', 'RGB'), ('gray.png', 'L'), ('palette.png', 'P'), ('alpha.png', 'RGBA'),
+         ('gray_alpha.png', 'LA'), ('rgb.jpg', 'RGB'), ('gray.jpg', 'L'), ('rgb.bmp', 'RGB')]
+
+
+@pytest.mark.parametrize('name, mode', MODES)
+@pytest.mark.parametrize('image_size', [(120, 160), (256, 256), (64, 48)])
+def test_read_rgb_matches_training_pipeline(tmp_path, name, mode, image_size):
+    path = str(tmp_path / name)
+    Image.fromarray(smooth_image((120, 160, 3))).convert(mode).save(path)
+    assert np.array_equal(read_rgb(path, image_size), decode_and_resize(path, image_size).numpy())
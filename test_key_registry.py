@@ -0,0 +1,57 @@
+import csv
+
+import pytest
+
+from key_registry import MANIFEST_KEY_LENGTH, KeyRegistry, new_key
+
+MANIFEST_FIELDS = ['original_image', 'encoded_image', 'start_row', 'start_col', 'gap', 'channels', 'num_bits',
+                   'delimiter_start', 'delimiter_end', 'horizontal', 'message_length', 'key']
+
+
+def write_manifest(path, keys):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        for i, key in enumerate(keys):
+            writer.writerow({'original_image': 'cover.png', 'encoded_image': f'cover_v{i}.png',
+                             'start_row': i, 'start_col': 0, 'gap': 1, 'channels': 'RGB', 'num_bits': 2,
+                             'delimiter_start': '#', 'delimiter_end': '#', 'horizontal': 1,
+                             'message_length': 10, 'key': key})
+
+
+def test_import_manifest_is_idempotent(tmp_path):
+    manifest = tmp_path / 'encoding_params_3x.csv'
+    write_manifest(manifest, ['abc12345', '', ''])
+    registry = KeyRegistry(str(tmp_path / 'keys.db'))
+
+    assert registry.import_manifest(manifest) == 3
+    keys = {params['key'] for params in registry.lookup_image('cover.png')}
+    assert registry.import_manifest(manifest) == 0
+    assert len(registry) == 3
+    assert {params['key'] for params in registry.lookup_image('cover.png')} == keys
+    assert 'abc12345' in keys
+
+
+def test_register_returns_existing_key_for_same_cover_and_params(tmp_path):
+    registry = KeyRegistry(str(tmp_path / 'keys.db'))
+    params = {'start_position': (3, 4), 'gap': 0, 'channels': 'RG', 'num_bits': 1,
+              'delimiter_start': '#', 'delimiter_end': '#', 'horizontal': 0, 'message_length': 5}
+
+    key = registry.register(params, image='cover.png')
+    assert registry.register(params, image='cover.png') == key
+    assert registry.register(params, image='other.png') != key
+    assert registry.lookup(key)['image'] == 'cover.png'
+
+
+def test_duplicate_manifest_key_is_reported(tmp_path):
+    manifest = tmp_path / 'encoding_params_2x.csv'
+    write_manifest(manifest, ['samekey', 'samekey'])
+    registry = KeyRegistry(str(tmp_path / 'keys.db'))
+
+    with pytest.raises(ValueError, match='samekey'):
+        registry.import_manifest(manifest)
+    assert len(registry) == 0
+
+
+def test_generated_manifest_keys_are_full_length():
+    assert len(new_key(MANIFEST_KEY_LENGTH)) == 32 and len(new_key()) == 8
@@ -0,0 +1,24 @@
+import random
+
+from message_generator import MessagePool
+
+LENGTHS = [1, 5, 40, 300, 0, 2500]
+
+
+def small_pool(seed=None):
+    return MessagePool(corpus_size=20_000, seed=seed, cache_dir=None)
+
+
+def test_batched_messages_match_single_calls():
+    batch = small_pool(seed=3).messages_by_length(LENGTHS)
+    single_pool = small_pool(seed=3)
+    assert batch == [single_pool.message_by_length(length) for length in LENGTHS]
+
+
+def test_batched_messages_respect_lengths_and_seed():
+    batch = small_pool().messages_by_length(LENGTHS, random.Random(7))
+    assert batch == small_pool().messages_by_length(LENGTHS, random.Random(7))
+    assert batch[4] == ''
+    for length, message in zip(LENGTHS, batch):
+        # Snapping to a word boundary may cut up to 20%, the closing period adds one character
+        assert length == 0 or 0.8 * length - 1 <= len(message) <= length + 1
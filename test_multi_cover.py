@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from multi_cover import decode_multi_cover, encode_multi_cover, shard_capacity
+
+PARAMS = dict(gap=2, channels='RGB', num_bits=8)
+
+
+def write_covers(directory, count, shape=(10, 10, 3)):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'cover_{i}.png')
+        Image.fromarray(rng.integers(0, 256, size=shape, dtype=np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_shards_of_exactly_shard_capacity_encode(tmp_path):
+    covers = write_covers(str(tmp_path), 2)
+    capacity = shard_capacity((10, 10), **PARAMS)
+    assert capacity == 68  # 33 whole pixels * 3 bytes - frame header - shard header
+
+    # The framed payload (7-byte frame header) splits into two shards of exactly `capacity` bytes
+    message = bytes(range(256)) * 2
+    message = message[:2 * capacity - 7]
+    paths = encode_multi_cover(covers, str(tmp_path / 'out'), message, workers=1, **PARAMS)
+    assert paths is not None
+    assert decode_multi_cover(paths, workers=1, **PARAMS) == message
+
+    assert encode_multi_cover(covers, str(tmp_path / 'over'), message + b'!', workers=1, **PARAMS) is None
+
+
+def test_one_lost_shard_is_rebuilt_from_parity(tmp_path):
+    covers = write_covers(str(tmp_path), 4, shape=(32, 32, 3))
+    message = "one message spread over three data covers and a parity cover " * 3
+    paths = encode_multi_cover(covers, str(tmp_path / 'out'), message, parity_group=3, workers=1, **PARAMS)
+    assert len(paths) == 4
+
+    for lost in range(4):
+        remaining = paths[:lost] + paths[lost + 1:]
+        assert decode_multi_cover(remaining[::-1], workers=1, **PARAMS) == message
+    assert decode_multi_cover(paths[:2], workers=1, **PARAMS) is None
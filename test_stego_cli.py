@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from encode_decode import encode_message
+from stego_cli import build_parser, codec_params, main
+
+
+@pytest.mark.parametrize('options', [
+    ['--gap', '2', '--num-bits', '8'],
+    ['--gap', '1', '--channels', 'GB', '--num-bits', '3', '--vertical', '--delimiters', '<<', '>>'],
+    ['--gap', '4', '--num-bits', '2', '--framing', 'binary'],
+])
+def test_capacity_matches_what_encodes(tmp_path, capsys, options):
+    cover = str(tmp_path / 'cover.png')
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, size=(10, 10, 3), dtype=np.uint8)).save(cover)
+
+    assert main(['capacity', cover] + options) == 0
+    capacity = int(capsys.readouterr().out.split('\t')[2].split()[0])
+
+    args = build_parser().parse_args(['capacity', cover] + options)
+    params = codec_params(args)
+    out = str(tmp_path / 'out.png')
+    assert encode_message(cover, out, 'x' * capacity, **params)
+    assert not encode_message(cover, out, 'x' * (capacity + 1), **params)
@@ -0,0 +1,26 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from image_io import read_rgb
+from training_data import decode_and_resize
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def smooth_image(shape, seed=0):
+    # Natural-looking gradients, so JPEG decoders actually have detail to disagree on
+    noise = np.random.default_rng(seed).normal(0, 4, shape)
+    image = np.cumsum(np.cumsum(noise, axis=0), axis=1)
+    return ((image - image.min()) / (image.max() - image.min()) * 255).astype(np.uint8)
+
+
+def test_jpeg_decodes_like_read_rgb(tmp_path):
+    path = str(tmp_path / 'cover.jpg')
+    Image.fromarray(smooth_image((256, 256, 3))).save(path, quality=85)
+    assert np.array_equal(decode_and_resize(path, (256, 256)).numpy(), read_rgb(path, (256, 256)))
+
+    man = os.path.join(REPO_DIR, 'images', 'man.jpg')
+    size = read_rgb(man).shape[:2]
+    assert np.array_equal(decode_and_resize(man, size).numpy(), read_rgb(man, size))
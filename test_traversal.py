@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import encode_decode
+import traversal
+from encode_decode import decode_array, encode_array
+from traversal import keyed_permutation, traversal_indices
+
+
+# Reference: the original per-pixel position formula, clipped at the end of the image
+def baseline_indices(rows, cols, start_position, gap, horizontal, n_pixels, first_index):
+    start_row, start_col = start_position
+    indices = []
+    for pixel_index in range(first_index, first_index + n_pixels):
+        offset = pixel_index * (gap + 1)
+        if horizontal:
+            total = start_row * cols + start_col + offset
+            row, col = total // cols, total % cols
+        else:
+            total = start_col * rows + start_row + offset
+            row, col = total % rows, total // rows
+        if row >= rows or col >= cols:
+            break
+        indices.append(row * cols + col)
+    return np.array(indices, dtype=np.int64)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_unkeyed_indices_match_baseline(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = (int(v) for v in rng.integers(1, 12, size=2))
+    args = (rows, cols, (int(rng.integers(rows)), int(rng.integers(cols))), int(rng.integers(4)),
+            int(rng.integers(2)), int(rng.integers(0, 150)), int(rng.integers(0, 40)))
+    assert np.array_equal(traversal_indices(*args), baseline_indices(*args))
+
+
+def test_keyed_indices_permute_unkeyed_positions():
+    args = (7, 9, (2, 3), 1, 0, 20, 3)
+    permutation = keyed_permutation(7, 9, 'secret')
+    assert sorted(permutation) == list(range(63))
+    assert np.array_equal(traversal_indices(*args, key='secret'), permutation[traversal_indices(*args)])
+
+
+def test_keyed_decode_builds_permutation_once_when_it_does_not_fit_the_cache(monkeypatch):
+    builds = []
+
+    def counting_permutation(rows, cols, key):
+        builds.append(key)
+        return keyed_permutation(rows, cols, key)
+
+    monkeypatch.setattr(traversal, 'keyed_permutation', counting_permutation)
+    monkeypatch.setattr(encode_decode, 'keyed_permutation', counting_permutation)
+    monkeypatch.setattr(traversal, '_plan_cache', traversal.MemoryBoundedLRU(0))
+
+    img = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    message = 'keyed message ' * 100  # long enough to be read in several chunks
+    encoded = encode_array(img, message, key='secret')
+    builds.clear()
+    assert decode_array(encoded, key='secret') == message
+    assert len(builds) == 1
@@ -0,0 +1,187 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+
+CONFIG = {
+    'IMAGE_SIZE': (256, 256),
+    'BATCH_SIZE': 32,
+    'VALIDATION_SPLIT': 0.2,
+    'TEST_SPLIT': 0.1,
+    'SHUFFLE_BUFFER': 2048,
+}
+
+DATA_DIR = Path(r"data")
+CLEAN_IMAGES_DIR = DATA_DIR / "linnaeus5"
+ENCODED_IMAGES_DIR = DATA_DIR / "encoded_1x"
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def collect_image_paths(clean_dir=CLEAN_IMAGES_DIR, encoded_dir=ENCODED_IMAGES_DIR):
+    """Image paths and labels (0 clean, 1 stego) in the same order as the training notebook"""
+    image_paths, labels = [], []
+    for directory, label in ((Path(clean_dir), 0), (Path(encoded_dir), 1)):
+        if directory.exists():
+            files = list(directory.rglob("*.png")) + list(directory.rglob("*.jpg"))
+            image_paths.extend(str(p) for p in files)
+            labels.extend([label] * len(files))
+    return np.array(image_paths), np.array(labels)
+
+
+def prepare_dataset(clean_dir=CLEAN_IMAGES_DIR, encoded_dir=ENCODED_IMAGES_DIR,
+                    test_split=CONFIG['TEST_SPLIT'], validation_split=CONFIG['VALIDATION_SPLIT']):
+    """Collect image paths and create train/val/test splits (identical to the notebook's prepare_dataset)"""
+    image_paths, labels = collect_image_paths(clean_dir, encoded_dir)
+    if len(image_paths) == 0:
+        raise ValueError("No images found!")
+
+    X_temp, X_test, y_temp, y_test = train_test_split(image_paths, labels, test_size=test_split,
+                                                      stratify=labels, random_state=42)
+    X_train, X_val, y_train, y_val = train_test_split(X_temp, y_temp, test_size=validation_split/(1-test_split),
+                                                      stratify=y_temp, random_state=42)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def decode_rgb(contents):
+    """
+    RGB uint8 image from encoded file bytes. JPEGs use the accurate integer
+    DCT, which gives the same pixels as PIL and cv2; TF's default fast DCT
+    would leave a decoder fingerprint on the clean JPEG class.
+    """
+    return tf.cond(tf.io.is_jpeg(contents),
+                   lambda: tf.io.decode_jpeg(contents, channels=3, dct_method='INTEGER_ACCURATE'),
+                   lambda: tf.io.decode_image(contents, channels=3, expand_animations=False))
+
+
+def decode_and_resize(path, image_size=CONFIG['IMAGE_SIZE']):
+    """tf.data counterpart of the notebook's load_image up to the scaling: RGB uint8, bilinear resize"""
+    image = decode_rgb(tf.io.read_file(path))
+
+    # Covers are usually stored at the training size already, skip the resize then
+    same_size = tf.reduce_all(tf.shape(image)[:2] == tf.constant(image_size))
+    image = tf.cond(same_size, lambda: image,
+                    lambda: tf.cast(tf.round(tf.image.resize(image, image_size, method='bilinear')), tf.uint8))
+    return tf.ensure_shape(image, (*image_size, 3))
+
+
+def scale_batch(images, augment=False):
+    """
+    Scale a uint8 batch to [0, 1]. With augment=True this is a batched
+    augment_image: random horizontal flip and random brightness, each with
+    probability 0.5, fused with the scaling.
+    """
+    if not augment:
+        return tf.cast(images, tf.float32) / 255.0
+
+    batch = tf.shape(images)[0]
+    images = tf.image.random_flip_left_right(images)
+
+    # One multiply does both the brightness change and the 1/255 scaling; values are never negative
+    rescale = tf.random.uniform([batch, 1, 1, 1]) > 0.5
+    factor = tf.where(rescale, tf.random.uniform([batch, 1, 1, 1], 0.8, 1.2), 1.0) / 255.0
+    return tf.minimum(tf.cast(images, tf.float32) * factor, 1.0)
+
+
+def load_image(path, image_size=CONFIG['IMAGE_SIZE']):
+    """One image scaled to [0, 1] as a float32 array, preprocessed exactly like a make_dataset batch"""
+    return scale_batch(decode_and_resize(str(path), image_size)[None])[0].numpy()
+
+
+def make_dataset(image_paths, labels, batch_size=CONFIG['BATCH_SIZE'], augment=False, shuffle=False,
+                 repeat=False, cache=None, image_size=CONFIG['IMAGE_SIZE'], shuffle_buffer=CONFIG['SHUFFLE_BUFFER']):
+    """
+    Parallel input pipeline for training and evaluation.
+
+    Files are decoded with num_parallel_calls=AUTOTUNE, scaling and
+    augmentation run on whole batches and the next batches are prefetched
+    while the model trains. cache='memory' keeps decoded uint8 images in RAM
+    and a file path caches them on disk; either way only the first epoch
+    decodes. Images that fail to decode are skipped.
+    """
+    ds = tf.data.Dataset.from_tensor_slices((np.asarray(image_paths, dtype=str),
+                                             np.asarray(labels, dtype=np.float32)))
+
+    # Without a cache, shuffle the (cheap) paths over the whole set before decoding
+    if shuffle and cache is None:
+        ds = ds.shuffle(len(image_paths), reshuffle_each_iteration=True)
+
+    ds = ds.map(lambda path, label: (decode_and_resize(path, image_size), label),
+                num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+    ds = ds.ignore_errors()
+
+    if cache is not None:
+        ds = ds.cache('' if cache == 'memory' else str(cache))
+        if shuffle:
+            ds = ds.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+
+    if repeat:
+        ds = ds.repeat()
+
+    ds = ds.batch(batch_size, num_parallel_calls=AUTOTUNE)
+    ds = ds.map(lambda images, labels: (scale_batch(images, augment), labels), num_parallel_calls=AUTOTUNE)
+
+    return ds.prefetch(AUTOTUNE)
+
+
+def python_generator(image_paths, labels, batch_size, augment=False, image_size=CONFIG['IMAGE_SIZE']):
+    """The notebook's original load_image/data_generator loop, kept as the benchmark reference"""
+    import cv2
+
+    def load_image(image_path):
+        try:
+            image = cv2.imread(str(image_path))
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            image = cv2.resize(image, image_size)
+            return image.astype(np.float32) / 255.0
+        except Exception:
+            return np.zeros((*image_size, 3), dtype=np.float32)
+
+    def augment_image(image):
+        if np.random.random() > 0.5:
+            image = np.fliplr(image)
+        if np.random.random() > 0.5:
+            image = np.clip(image * np.random.uniform(0.8, 1.2), 0, 1)
+        return image
+
+    while True:
+        indices = np.random.permutation(len(image_paths))
+        for i in range(0, len(indices), batch_size):
+            batch_images, batch_labels = [], []
+            for idx in indices[i:i+batch_size]:
+                image = load_image(image_paths[idx])
+                if augment:
+                    image = augment_image(image)
+                batch_images.append(image)
+                batch_labels.append(labels[idx])
+            yield np.array(batch_images), np.array(batch_labels)
+
+
+def benchmark_pipeline(image_paths, labels, batch_size=CONFIG['BATCH_SIZE'], num_batches=50, augment=True):
+    """Images/sec of the original Python generator and of make_dataset on the same files"""
+    def images_per_sec(batches):
+        next(batches)  # warm-up: thread pools, first file reads
+        start = time.perf_counter()
+        count = 0
+        for _ in range(num_batches):
+            images, _ = next(batches)
+            count += len(images)
+        return count / (time.perf_counter() - start)
+
+    generator_rate = images_per_sec(python_generator(image_paths, labels, batch_size, augment))
+    dataset = make_dataset(image_paths, labels, batch_size, augment=augment, shuffle=True, repeat=True)
+    dataset_rate = images_per_sec(iter(dataset))
+
+    return {
+        'generator_images_per_sec': round(generator_rate, 1),
+        'tf_data_images_per_sec': round(dataset_rate, 1),
+        'speedup': round(dataset_rate / generator_rate, 2),
+    }
+
+
+if __name__ == "__main__":
+    X_train, X_val, X_test, y_train, y_val, y_test = prepare_dataset()
+    print(f"Train: {len(X_train)}, Val: {len(X_val)}, Test: {len(X_test)}")
+    print(benchmark_pipeline(X_train, y_train))
@@ -0,0 +1,87 @@
+import hashlib
+import struct
+
+import numpy as np
+
+from memory_cache import MemoryBoundedLRU
+
+# Memory cap for cached keyed permutations
+PLAN_CACHE_BYTES = 256 * 1024 * 1024
+
+_plan_cache = MemoryBoundedLRU(PLAN_CACHE_BYTES)
+
+
+def set_plan_cache_bytes(max_bytes):
+    """Resize the traversal plan cache (drops every cached plan)"""
+    global _plan_cache
+    _plan_cache = MemoryBoundedLRU(max_bytes)
+
+
+def plan_cache():
+    return _plan_cache
+
+
+def _index_dtype(pixel_total):
+    return np.int32 if pixel_total < 2**31 else np.int64
+
+
+def _key_bytes(key):
+    if isinstance(key, (bytes, bytearray)):
+        return bytes(key)
+    return str(key).encode('utf-8')
+
+
+def keyed_permutation(rows, cols, key):
+    """
+    Pseudo-random permutation of the rows * cols flat pixel positions,
+    derived from the key and the shape only.
+
+    The order comes from sorting raw PCG64 output, which NumPy keeps stable
+    across versions (unlike Generator.permutation), so an image encoded
+    with one NumPy release decodes with any other.
+    """
+    cache_key = ('permutation', rows, cols, _key_bytes(key))
+
+    def build():
+        digest = hashlib.sha256(b'stego-traversal' + struct.pack('>QQ', rows, cols) + _key_bytes(key)).digest()
+        raw = np.random.PCG64(int.from_bytes(digest[:16], 'big')).random_raw(rows * cols)
+        permutation = np.argsort(raw, kind='stable').astype(_index_dtype(rows * cols))
+        permutation.setflags(write=False)
+        return permutation
+
+    return _plan_cache.get_or_create(cache_key, build)
+
+
+def start_offset(rows, cols, start_position, horizontal):
+    """Position of start_position within the (0, 0) traversal order"""
+    r_start, c_start = start_position
+    return r_start * cols + c_start if horizontal else c_start * rows + r_start
+
+
+def traversal_indices(rows, cols, start_position, gap, horizontal, n_pixels, first_index=0, key=None,
+                      permutation=None):
+    """
+    Flat positions of traversal pixels first_index .. first_index + n_pixels - 1,
+    cut short at the end of the image.
+
+    Without a key only the requested range is computed, so a short decode
+    costs nothing per image pixel. With a key the same positions are looked
+    up in keyed_permutation; callers reading one traversal in many chunks
+    pass that permutation in, so it is built once even when it is too
+    large for the plan cache.
+    """
+    step = gap + 1
+    first = start_offset(rows, cols, start_position, horizontal) + first_index * step
+    available = max(0, -(-(rows * cols - first) // step))
+    offsets = first + np.arange(min(n_pixels, available), dtype=np.int64) * step
+
+    if horizontal:
+        indices = offsets
+    else:
+        indices = (offsets % rows) * cols + offsets // rows
+
+    if permutation is None and key is not None:
+        permutation = keyed_permutation(rows, cols, key)
+    if permutation is not None:
+        return permutation[indices]
+    return indices.astype(_index_dtype(rows * cols))
@@ -0,0 +1,150 @@
+import argparse
+import csv
+import itertools
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from encode_decode import decode_message
+
+REPORT_FIELDS = ['encoded_image', 'original_image', 'variation_number', 'problem', 'detail',
+                 'message_length', 'decoded_length', 'first_difference',
+                 'start_row', 'start_col', 'gap', 'channels', 'num_bits',
+                 'delimiter_start', 'delimiter_end', 'horizontal']
+
+
+def default_images_dir(csv_path):
+    """encoded_{N}x next to an encoding_params_{N}x.csv manifest"""
+    match = re.search(r'encoding_params_(\w+?)\.csv$', os.path.basename(csv_path))
+    name = f"encoded_{match.group(1)}" if match else "encoded"
+    return os.path.join(os.path.dirname(csv_path), name)
+
+
+def iter_manifest_chunks(csv_path, chunk_rows=2000):
+    """Manifest rows in lists of chunk_rows, without loading the whole file"""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        while True:
+            chunk = list(itertools.islice(reader, chunk_rows))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _report_row(row, problem, detail='', decoded=None):
+    report = {field: row.get(field, '') for field in REPORT_FIELDS}
+    report.update(problem=problem, detail=detail, message_length=len(row['message']))
+    if decoded is not None:
+        report['decoded_length'] = len(decoded)
+        expected = row['message']
+        report['first_difference'] = next((i for i, (a, b) in enumerate(zip(expected, decoded)) if a != b),
+                                          min(len(expected), len(decoded)))
+    return report
+
+
+def verify_rows(rows, images_dir):
+    """
+    Decode every row and compare with its message. Returns (rows checked,
+    report rows for the ones that failed).
+    """
+    problems = []
+    for row in rows:
+        path = os.path.join(images_dir, row['encoded_image'])
+        if not os.path.exists(path):
+            problems.append(_report_row(row, 'missing_image', path))
+            continue
+        try:
+            decoded = decode_message(path, start_position=(int(row['start_row']), int(row['start_col'])),
+                                     gap=int(row['gap']), channels=row['channels'], num_bits=int(row['num_bits']),
+                                     delimiter_start=row['delimiter_start'], delimiter_end=row['delimiter_end'],
+                                     horizontal=int(float(row['horizontal'])))
+        except Exception as e:
+            problems.append(_report_row(row, 'decode_error', repr(e)))
+            continue
+
+        if decoded != row['message']:
+            # The usual culprit: the end delimiter also occurs inside the message
+            inside = row['delimiter_end'] and row['delimiter_end'] in row['message']
+            problems.append(_report_row(row, 'mismatch', 'delimiter_end occurs in message' if inside else '',
+                                        decoded))
+    return len(rows), problems
+
+
+def verify_dataset(csv_path, images_dir=None, report_path=None, workers=None, chunk_rows=2000, task_rows=64,
+                   max_pending=None):
+    """
+    Check that every manifest row decodes back to its message.
+
+    The manifest is read chunk by chunk; each chunk is cut into tasks of
+    task_rows rows and verified in a process pool, with at most
+    max_pending tasks in flight. Failures stream to a CSV report
+    (problem = missing_image, decode_error or mismatch). Returns a summary dict.
+    """
+    images_dir = images_dir or default_images_dir(csv_path)
+    report_path = report_path or os.path.splitext(csv_path)[0] + "_verify_report.csv"
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 4 * workers
+
+    checked = failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            open(report_path, 'w', newline='', encoding='utf-8') as report_file, \
+            tqdm(desc="Verifying", unit="img") as progress:
+        report = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        report.writeheader()
+        pending = deque()
+
+        def collect_one():
+            nonlocal checked, failed
+            count, problems = pending.popleft().result()
+            checked += count
+            failed += len(problems)
+            report.writerows(problems)
+            progress.update(count)
+
+        for chunk in iter_manifest_chunks(csv_path, chunk_rows):
+            for first in range(0, len(chunk), task_rows):
+                pending.append(pool.submit(verify_rows, chunk[first:first + task_rows], images_dir))
+                while len(pending) >= max_pending:
+                    collect_one()
+        while pending:
+            collect_one()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'checked': checked,
+        'ok': checked - failed,
+        'failed': failed,
+        'seconds': round(elapsed, 2),
+        'images_per_sec': round(checked / elapsed, 1) if elapsed else 0.0,
+        'report': report_path,
+    }
+    print(f"Verified {checked} images in {elapsed:.1f}s ({summary['images_per_sec']} images/sec): "
+          f"{summary['ok']} ok, {failed} failed")
+    if failed:
+        print(f"!!! Mismatch report written to {report_path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every dataset manifest row decodes to its message")
+    parser.add_argument("manifest", help="encoding_params_{N}x.csv")
+    parser.add_argument("--images-dir", default=None, help="Encoded images (default: encoded_{N}x next to the manifest)")
+    parser.add_argument("--report", default=None, help="Mismatch report CSV")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=2000, help="Manifest rows read at a time")
+    parser.add_argument("--task-rows", type=int, default=64, help="Rows per worker task")
+    args = parser.parse_args()
+
+    summary = verify_dataset(args.manifest, args.images_dir, args.report, args.workers,
+                             args.chunk_rows, args.task_rows)
+    sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()